@@ -2,12 +2,30 @@ import logging
 import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import List
-import aiofiles
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import gc
+import hashlib
+import io
 import os
+import shutil
+import tempfile
+import time
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+import orjson
+from pydantic import BaseModel
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.requests import Request
 from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY, HTTP_500_INTERNAL_SERVER_ERROR
 
 from models import (
@@ -18,582 +36,636 @@ from models import (
 from config import settings
 from services.rag_agent import rag_service
 from services.periodic_indexer import periodic_indexer
+from services.semantic_cache import semantic_cache
 
 from services.ocr_service import ocr_service
 from services.transcription_service import transcription_service
 
 logger = logging.getLogger(__name__)
 
+# Read/write uploads in 1MB chunks instead of buffering the whole body
+CHUNK = 1 << 20
+
+# Upload size limits in bytes, so checks are a plain integer compare
+_MB = 1024 * 1024
+_MAX_DOC_BYTES = settings.max_file_size_mb * _MB
+_MAX_AUDIO_BYTES = 100 * _MB
+
+# Upload validation lookups, built once instead of per request
+_ALLOWED_EXT = settings.supported_extensions
+_ALLOWED_EXT_STR = ', '.join(sorted(_ALLOWED_EXT))
+_AUDIO_MIME_LIST = (
+    'audio/wav', 'audio/mp3', 'audio/mpeg', 'audio/ogg',
+    'audio/flac', 'audio/aac', 'audio/webm', 'audio/m4a'
+)
+_AUDIO_MIMES = frozenset(_AUDIO_MIME_LIST)
+_AUDIO_MIMES_STR = ', '.join(_AUDIO_MIME_LIST)
+
+# Pre-encoded server-sent event framing for the streaming endpoint
+_SSE_PREFIX = b"data: "
+_SSE_SEP = b"\n\n"
+_SSE_DONE = b"data: [DONE]\n\n"
+
+# Status endpoints are polled by dashboards; serve them from a short-lived cache
+_STATUS_TTL_SECONDS = 2.0
+_status_cache: Dict[str, Tuple[float, Any]] = {}
+
+class ErrorLoggingRoute(APIRoute):
+    """Route that logs unexpected endpoint errors and returns them as 500s
+    
+    Handled per route rather than with an app-level Exception handler so the
+    error response still passes through the CORS middleware.
+    """
+    
+    def get_route_handler(self):
+        route_handler = super().get_route_handler()
+        
+        async def error_logging_handler(request: Request):
+            try:
+                return await route_handler(request)
+            except (StarletteHTTPException, RequestValidationError):
+                raise
+            except Exception as e:
+                logger.exception(f"Error handling {request.method} {request.url.path}: {e}")
+                raise HTTPException(
+                    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=str(e)
+                )
+        
+        return error_logging_handler
+
 # Create API router
-router = APIRouter(prefix="/api/v1", tags=["Hebrew RAG"])
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Hebrew RAG"],
+    default_response_class=ORJSONResponse,
+    route_class=ErrorLoggingRoute
+)
+
+def _copy_upload(src, dst_fd: int, max_bytes: Optional[int]) -> int:
+    """Copy an upload's spooled file into an open descriptor (runs in a worker thread)"""
+    with os.fdopen(dst_fd, 'wb') as dst:
+        src.seek(0, os.SEEK_END)
+        size = src.tell()
+        src.seek(0)
+        
+        if max_bytes is not None and size > max_bytes:
+            return size
+        
+        # Spooled files that already rolled over to disk can be copied kernel-to-kernel;
+        # calling fileno() on an in-memory spool would force a rollover, so skip it there
+        if hasattr(os, "sendfile") and getattr(src, "_rolled", True):
+            try:
+                src_fd = src.fileno()
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return size
+            except (OSError, AttributeError, io.UnsupportedOperation):
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst, CHUNK)
+    return size
+
+def _file_extension(filename: Optional[str]) -> str:
+    """Lower-cased extension including the dot, without building a Path"""
+    if not filename:
+        return ""
+    dot = filename.rfind('.')
+    # Only the final path component counts, so "a.x/../y" can't leak separators
+    start = max(filename.rfind('/'), filename.rfind('\\')) + 1
+    if dot <= start or dot == len(filename) - 1:
+        return ""
+    return filename[dot:].lower()
+
+def upload_size(file: UploadFile) -> int:
+    """Size of an upload in bytes, falling back to the spooled file when not reported"""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+def _remove_temp_files(file_paths: List[Path]):
+    """Delete temporary upload files, logging any that can't be removed"""
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.warning(f"Failed to remove temporary file {file_path}: {e}")
+
+def _file_too_large(file: UploadFile, size: int, max_bytes: int) -> HTTPException:
+    """Build the 422 raised for oversized uploads"""
+    return HTTPException(
+        status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=f"File {file.filename} is too large: {size / _MB:.1f}MB (max: {max_bytes // _MB}MB)"
+    )
+
+async def persist_upload(file: UploadFile, max_bytes: Optional[int] = None, prefix: str = "upload_") -> Path:
+    """Persist an uploaded file to a unique temp file, rejecting it if it exceeds max_bytes
+    
+    The client-supplied filename is only used for its extension, so uploads can't
+    escape upload_dir and concurrent uploads with the same name don't collide.
+    """
+    # Reject using the size Starlette recorded while parsing the multipart body,
+    # before creating or writing anything
+    if max_bytes is not None and file.size is not None and file.size > max_bytes:
+        raise _file_too_large(file, file.size, max_bytes)
+    
+    fd, temp_path = tempfile.mkstemp(dir=settings.upload_dir, prefix=prefix, suffix=_file_extension(file.filename))
+    file_path = Path(temp_path)
+    try:
+        size = await run_in_threadpool(_copy_upload, file.file, fd, max_bytes)
+        # Second line of defense when the size wasn't known up front
+        if max_bytes is not None and size > max_bytes:
+            raise _file_too_large(file, size, max_bytes)
+    except BaseException:
+        # Don't leave partially written files behind
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        raise
+    return file_path
+
+async def _cached_status(name: str, compute: Callable[[], Union[Any, Awaitable[Any]]]) -> Any:
+    """Return a status value computed at most once per _STATUS_TTL_SECONDS"""
+    now = time.monotonic()
+    entry = _status_cache.get(name)
+    if entry is not None and now - entry[0] < _STATUS_TTL_SECONDS:
+        return entry[1]
+    
+    value = compute()
+    if asyncio.iscoroutine(value):
+        value = await value
+    _status_cache[name] = (now, value)
+    return value
+
+# /system/memory reuses one psutil snapshot for bursts of polling
+_GIB = 1073741824
+_VMEM_TTL_SECONDS = 0.5
+_vmem_cache = {"t": 0.0, "v": None}
+
+# Health timestamps only need one-second resolution
+_timestamp_cache = [0.0, ""]
+
+def _now_iso() -> str:
+    """Current UTC time in ISO format, reformatted at most once per second"""
+    now = time.time()
+    if now - _timestamp_cache[0] >= 1.0:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.utcnow().isoformat()
+    return _timestamp_cache[1]
+
+async def _virtual_memory():
+    """psutil.virtual_memory(), refreshed at most every _VMEM_TTL_SECONDS"""
+    now = time.monotonic()
+    if _vmem_cache["v"] is None or now - _vmem_cache["t"] > _VMEM_TTL_SECONDS:
+        _vmem_cache["v"] = await run_in_threadpool(psutil.virtual_memory)
+        _vmem_cache["t"] = now
+    return _vmem_cache["v"]
+
+def _etag_response(request: Request, payload: Any) -> Response:
+    """JSON response with an ETag, answering 304 when the client already has it"""
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"max-age={int(_STATUS_TTL_SECONDS)}"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _model_response(model: BaseModel) -> Response:
+    """Serialize a response model straight to JSON.
+
+    Returning the model itself makes FastAPI dump it, re-validate the dump
+    against response_model and encode it again; the declared response_model
+    still documents the endpoint.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+def _invalidate_status():
+    """Drop cached status values after an operation that changes them"""
+    _status_cache.clear()
 
 # Health endpoint
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    return HealthResponse(
+    return _model_response(HealthResponse(
         status="healthy",
         version="1.0.0",
-        services={
-            "rag_agent": "initialized" if rag_service.rag_agent.initialized else "not_initialized",
-            "vector_store": "active",
-            "llm": "active",
-            "ocr": "active",
-            "transcription": "active" if transcription_service.initialized else "not_initialized",
-            "periodic_indexer": "active" if periodic_indexer.running else "inactive"
-        },
-        timestamp=datetime.utcnow().isoformat()
-    )
+        services=await _cached_status("health", _health_services),
+        timestamp=_now_iso()
+    ))
+
+def _health_services() -> Dict[str, str]:
+    return {
+        "rag_agent": "initialized" if rag_service.rag_agent.initialized else "not_initialized",
+        "vector_store": "active",
+        "llm": "active",
+        "ocr": "active",
+        "transcription": "active" if transcription_service.initialized else "not_initialized",
+        "periodic_indexer": "active" if periodic_indexer.running else "inactive"
+    }
 
 # Query endpoint
 @router.post("/query", response_model=QueryResponse)
 async def query_documents(request: QueryRequest):
     """Query the document collection"""
-    try:
-        if not request.question.strip():
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Question cannot be empty"
-            )
-        
-        result = await rag_service.query_documents(
-            question=request.question,
-            stream=request.stream
-        )
-        
-        if not result["success"]:
-            raise HTTPException(
-                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=result["error"]
-            )
-        
-        return QueryResponse(
-            success=True,
-            response=result.get("response"),
-            metadata=result.get("metadata")
+    if not request.question.strip():
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Question cannot be empty"
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Query error: {e}")
+    
+    if not request.stream:
+        cache_generation = semantic_cache.generation
+        cached = await semantic_cache.get(request.question)
+        if cached is not None:
+            return _model_response(QueryResponse(success=True, **cached))
+    
+    result = await rag_service.query_documents(
+        question=request.question,
+        stream=request.stream
+    )
+    
+    if not result["success"]:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            detail=result["error"]
         )
+    
+    if not request.stream:
+        await semantic_cache.put(request.question, {
+            "response": result.get("response"),
+            "metadata": result.get("metadata")
+        }, cache_generation)
+    
+    return _model_response(QueryResponse(
+        success=True,
+        response=result.get("response"),
+        metadata=result.get("metadata")
+    ))
 
 # Streaming query endpoint
 @router.post("/query/stream")
 async def query_documents_stream(request: QueryRequest):
     """Query the document collection with streaming response"""
-    try:
-        if not request.question.strip():
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Question cannot be empty"
-            )
-        
-        result = await rag_service.query_documents(
-            question=request.question,
-            stream=True
-        )
-        
-        if not result["success"]:
-            raise HTTPException(
-                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=result["error"]
-            )
-        
-        async def generate_response():
-            try:
-                async for chunk in result["response_generator"]:
-                    yield f"data: {chunk}\n\n"
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                yield f"data: [ERROR] {str(e)}\n\n"
-        
-        return StreamingResponse(
-            generate_response(),
-            media_type="text/plain",
-            headers={"Cache-Control": "no-cache"}
+    if not request.question.strip():
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Question cannot be empty"
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Streaming query error: {e}")
+    
+    result = await rag_service.query_documents(
+        question=request.question,
+        stream=True
+    )
+    
+    if not result["success"]:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            detail=result["error"]
         )
+    
+    async def generate_response():
+        try:
+            async for chunk in result["response_generator"]:
+                yield _SSE_PREFIX + (chunk.encode() if isinstance(chunk, str) else chunk) + _SSE_SEP
+            yield _SSE_DONE
+        except Exception as e:
+            logger.error(f"Streaming error: {e}")
+            yield _SSE_PREFIX + f"[ERROR] {str(e)}".encode() + _SSE_SEP
+    
+    return StreamingResponse(
+        generate_response(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Document upload endpoint
 @router.post("/documents/upload", response_model=DocumentUploadResponse)
 async def upload_documents(files: List[UploadFile] = File(...)):
     """Upload and process documents"""
-    try:
-        if not files:
+    if not files:
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No files provided"
+        )
+    
+    # Validate file types
+    for file in files:
+        # Check file extension
+        file_extension = _file_extension(file.filename)
+        if file_extension not in _ALLOWED_EXT:
             raise HTTPException(
                 status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No files provided"
+                detail=f"Unsupported file type: {file_extension}. Supported types: {_ALLOWED_EXT_STR}"
             )
         
-        # Validate file types
-        allowed_extensions = set(settings.supported_extensions)
-        uploaded_files = []
-        
-        for file in files:
-            # Check file extension
-            file_extension = Path(file.filename).suffix.lower()
-            if file_extension not in allowed_extensions:
-                raise HTTPException(
-                    status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail=f"Unsupported file type: {file_extension}. Supported types: {', '.join(allowed_extensions)}"
-                )
-            
-            # Save uploaded file
-            file_path = Path(settings.upload_dir) / file.filename
-            
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                
-                # Check file size
-                file_size_mb = len(content) / (1024 * 1024)
-                if file_size_mb > settings.max_file_size_mb:
-                    raise HTTPException(
-                        status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                        detail=f"File {file.filename} is too large: {file_size_mb:.1f}MB (max: {settings.max_file_size_mb}MB)"
-                    )
-                
-                await f.write(content)
-            
-            uploaded_files.append(str(file_path))
-            logger.info(f"Saved uploaded file: {file_path}")
-        
-        # Process documents
-        result = await rag_service.add_documents_from_files(uploaded_files)
-        
-        # Clean up uploaded files
-        for file_path in uploaded_files:
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file {file_path}: {e}")
-        
-        return DocumentUploadResponse(
-            success=result["success"],
-            files_processed=result.get("files_processed", 0),
-            files_failed=result.get("files_failed", 0),
-            total_chunks=result.get("total_chunks", 0),
-            documents_added=result.get("documents_added", 0),
-            total_documents=result.get("total_documents", 0),
-            error=result.get("error"),
-            processing_details=result.get("processing_details")
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Document upload error: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+        # Check file size before any of the content is read
+        file_size = upload_size(file)
+        if file_size > _MAX_DOC_BYTES:
+            raise _file_too_large(file, file_size, _MAX_DOC_BYTES)
+    
+    # Process documents straight from the spooled uploads, no disk round-trip
+    result = await rag_service.add_documents_from_streams(
+        [(file.filename, file.file) for file in files]
+    )
+    
+    return _model_response(DocumentUploadResponse(
+        success=result["success"],
+        files_processed=result.get("files_processed", 0),
+        files_failed=result.get("files_failed", 0),
+        total_chunks=result.get("total_chunks", 0),
+        documents_added=result.get("documents_added", 0),
+        total_documents=result.get("total_documents", 0),
+        error=result.get("error"),
+        processing_details=result.get("processing_details")
+    ))
 
 # Statistics endpoint
 @router.get("/documents/stats", response_model=StatsResponse)
-async def get_document_stats():
+async def get_document_stats(request: Request):
     """Get knowledge base statistics"""
-    try:
-        result = await rag_service.get_stats()
-        
-        return StatsResponse(
-            success=result["success"],
-            stats=result.get("stats", {}),
-            error=result.get("error")
-        )
-        
-    except Exception as e:
-        logger.error(f"Stats error: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    result = await rag_service.get_stats()
+    
+    return _etag_response(request, StatsResponse(
+        success=result["success"],
+        stats=result.get("stats", {}),
+        error=result.get("error")
+    ).model_dump())
 
 # Clear documents endpoint
 @router.delete("/documents/clear", response_model=ClearResponse)
 async def clear_documents():
     """Clear all documents from the knowledge base"""
-    try:
-        result = await rag_service.clear_documents()
-        
-        return ClearResponse(
-            success=result["success"],
-            message=result.get("message"),
-            error=result.get("error")
-        )
-        
-    except Exception as e:
-        logger.error(f"Clear documents error: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    result = await rag_service.clear_documents()
+    
+    return _model_response(ClearResponse(
+        success=result["success"],
+        message=result.get("message"),
+        error=result.get("error")
+    ))
 
 # Periodic Indexer Management Endpoints
 @router.get("/indexer/status", response_model=IndexerStatusResponse)
-async def get_indexer_status():
+async def get_indexer_status(request: Request):
     """Get periodic indexer status"""
-    try:
-        status = await periodic_indexer.get_status()
-        return IndexerStatusResponse(
-            success=True,
-            status=status
-        )
-    except Exception as e:
-        logger.error(f"Error getting indexer status: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    status = await _cached_status("indexer", periodic_indexer.get_status)
+    return _etag_response(request, IndexerStatusResponse(
+        success=True,
+        status=status
+    ).model_dump())
 
 @router.post("/indexer/scan", response_model=IndexerControlResponse)
 async def force_indexer_scan():
     """Force an immediate scan of the watch directory"""
-    try:
-        await periodic_indexer.force_scan()
-        return IndexerControlResponse(
-            success=True,
-            message="Directory scan completed"
-        )
-    except Exception as e:
-        logger.error(f"Error forcing indexer scan: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    await periodic_indexer.force_scan()
+    _invalidate_status()
+    return _model_response(IndexerControlResponse(
+        success=True,
+        message="Directory scan completed"
+    ))
 
 @router.post("/indexer/start", response_model=IndexerControlResponse)
 async def start_indexer():
     """Start the periodic indexer"""
-    try:
-        await periodic_indexer.start()
-        return IndexerControlResponse(
-            success=True,
-            message="Periodic indexer started"
-        )
-    except Exception as e:
-        logger.error(f"Error starting indexer: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    await periodic_indexer.start()
+    _invalidate_status()
+    return _model_response(IndexerControlResponse(
+        success=True,
+        message="Periodic indexer started"
+    ))
 
 @router.post("/indexer/stop", response_model=IndexerControlResponse)
 async def stop_indexer():
     """Stop the periodic indexer"""
-    try:
-        await periodic_indexer.stop()
-        return IndexerControlResponse(
-            success=True,
-            message="Periodic indexer stopped"
-        )
-    except Exception as e:
-        logger.error(f"Error stopping indexer: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    await periodic_indexer.stop()
+    _invalidate_status()
+    return _model_response(IndexerControlResponse(
+        success=True,
+        message="Periodic indexer stopped"
+    ))
 
 # OCR Processing Endpoints
 @router.post("/ocr/process-image")
 async def process_image_ocr(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     task_type: str = "full"
 ):
     """Process image with OCR"""
-    try:
-        if not file:
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No file provided"
-            )
-        
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="File must be an image"
-            )
-        
-        # Save uploaded file temporarily
-        file_path = Path(settings.upload_dir) / f"ocr_temp_{file.filename}"
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        try:
-            # Process with OCR
-            result = await ocr_service.extract_text_from_image(
-                file_path, 
-                task_type=task_type
-            )
-            
-            return {
-                "success": result["success"],
-                "text": result.get("text", ""),
-                "method": result.get("method", ""),
-                "task_type": result.get("task_type", task_type),
-                "parsed": result.get("parsed"),
-                "error": result.get("error")
-            }
-            
-        finally:
-            # Clean up temporary file
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file {file_path}: {e}")
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"OCR processing error: {e}")
+    if not file:
         raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No file provided"
         )
+    
+    # Validate file type
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="File must be an image"
+        )
+    
+    # Save uploaded file temporarily
+    file_path = await persist_upload(file, prefix="ocr_temp_")
+    
+    try:
+        # Process with OCR
+        result = await ocr_service.extract_text_from_image(
+            file_path, 
+            task_type=task_type
+        )
+    except BaseException:
+        await run_in_threadpool(_remove_temp_files, [file_path])
+        raise
+    
+    # Clean up temporary file after the response is sent
+    background.add_task(_remove_temp_files, [file_path])
+    
+    return {
+        "success": result["success"],
+        "text": result.get("text", ""),
+        "method": result.get("method", ""),
+        "task_type": result.get("task_type", task_type),
+        "parsed": result.get("parsed"),
+        "error": result.get("error")
+    }
 
 @router.post("/ocr/process-pdf")
 async def process_pdf_ocr(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     task_type: str = "full"
 ):
     """Process PDF with OCR"""
-    try:
-        if not file:
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No file provided"
-            )
-        
-        # Validate file type
-        if file.content_type != 'application/pdf':
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="File must be a PDF"
-            )
-        
-        # Save uploaded file temporarily
-        file_path = Path(settings.upload_dir) / f"ocr_temp_{file.filename}"
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        try:
-            # Process with OCR
-            result = await ocr_service.extract_text_from_pdf(
-                file_path, 
-                task_type=task_type
-            )
-            
-            return {
-                "success": result["success"],
-                "text": result.get("text", ""),
-                "method": result.get("method", ""),
-                "task_type": result.get("task_type", task_type),
-                "total_pages": result.get("total_pages", 0),
-                "pages": result.get("pages", []),
-                "error": result.get("error")
-            }
-            
-        finally:
-            # Clean up temporary file
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file {file_path}: {e}")
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"PDF OCR processing error: {e}")
+    if not file:
         raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No file provided"
+        )
+    
+    # Validate file type
+    if file.content_type != 'application/pdf':
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="File must be a PDF"
         )
+    
+    # Save uploaded file temporarily
+    file_path = await persist_upload(file, prefix="ocr_temp_")
+    
+    try:
+        # Process with OCR
+        result = await ocr_service.extract_text_from_pdf(
+            file_path, 
+            task_type=task_type
+        )
+    except BaseException:
+        await run_in_threadpool(_remove_temp_files, [file_path])
+        raise
+    
+    # Clean up temporary file after the response is sent
+    background.add_task(_remove_temp_files, [file_path])
+    
+    return {
+        "success": result["success"],
+        "text": result.get("text", ""),
+        "method": result.get("method", ""),
+        "task_type": result.get("task_type", task_type),
+        "total_pages": result.get("total_pages", 0),
+        "pages": result.get("pages", []),
+        "error": result.get("error")
+    }
 
 @router.get("/ocr/status")
-async def get_ocr_status():
+async def get_ocr_status(request: Request):
     """Get OCR service status"""
-    try:
-        return {
-            "dots_ocr_available": ocr_service.dots_ocr.is_available(),
-            "tesseract_available": ocr_service.tesseract_ocr.is_available(),
-            "initialized": ocr_service.initialized,
-            "model_name": ocr_service.dots_ocr.model_name if ocr_service.dots_ocr.is_available() else None
-        }
-    except Exception as e:
-        logger.error(f"Error getting OCR status: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    return _etag_response(request, await _cached_status("ocr", _ocr_status))
+
+def _ocr_status() -> Dict[str, Any]:
+    dots_available = ocr_service.dots_ocr.is_available()
+    return {
+        "dots_ocr_available": dots_available,
+        "tesseract_available": ocr_service.tesseract_ocr.is_available(),
+        "initialized": ocr_service.initialized,
+        "model_name": ocr_service.dots_ocr.model_name if dots_available else None
+    }
 
 @router.get("/system/validation")
 async def validate_system_configuration():
     """Validate system configuration and environment"""
-    try:
-        from config import settings
-        validation_result = await settings.validate_configuration()
-        return validation_result
-    except Exception as e:
-        logger.error(f"Error validating system configuration: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    validation_result = await settings.validate_configuration()
+    return validation_result
 
 @router.get("/system/memory")
 async def get_memory_usage():
     """Get current memory usage information"""
-    try:
-        memory_info = {}
-        
-        # Get OCR service memory usage
-        if ocr_service.dots_ocr.is_available():
-            memory_info["ocr_service"] = ocr_service.dots_ocr.get_memory_usage()
-        
-        # Get system memory usage
-        try:
-            import psutil
-            memory_info["system"] = {
-                "memory_percent": psutil.virtual_memory().percent,
-                "memory_available": f"{psutil.virtual_memory().available / 1024**3:.2f} GB",
-                "memory_total": f"{psutil.virtual_memory().total / 1024**3:.2f} GB"
-            }
-        except ImportError:
-            memory_info["system"] = {"error": "psutil not available"}
-        
-        return memory_info
-    except Exception as e:
-        logger.error(f"Error getting memory usage: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    memory_info = {}
+    
+    # Get OCR service memory usage
+    if ocr_service.dots_ocr.is_available():
+        memory_info["ocr_service"] = ocr_service.dots_ocr.get_memory_usage()
+    
+    # Get system memory usage
+    if psutil is not None:
+        memory = await _virtual_memory()
+        memory_info["system"] = {
+            "memory_percent": memory.percent,
+            "memory_available": f"{memory.available / _GIB:.2f} GB",
+            "memory_total": f"{memory.total / _GIB:.2f} GB"
+        }
+    else:
+        memory_info["system"] = {"error": "psutil not available"}
+    
+    return memory_info
 
 @router.post("/system/cleanup")
 async def cleanup_memory():
     """Clean up memory and GPU cache"""
-    try:
-        # Clean up OCR service memory
-        if ocr_service.dots_ocr.is_available():
-            await ocr_service.dots_ocr.cleanup_memory()
-        
-        # Force garbage collection
-        import gc
-        gc.collect()
-        
-        return {
-            "success": True,
-            "message": "Memory cleanup completed successfully"
-        }
-    except Exception as e:
-        logger.error(f"Error during memory cleanup: {e}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    # Clean up OCR service memory
+    if ocr_service.dots_ocr.is_available():
+        await ocr_service.dots_ocr.cleanup_memory()
+    
+    # Force garbage collection
+    await run_in_threadpool(gc.collect)
+    _invalidate_status()
+    
+    return {
+        "success": True,
+        "message": "Memory cleanup completed successfully"
+    }
 
 # Transcription endpoints
 @router.post("/transcribe/audio")
 async def transcribe_audio(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     language: str = "he",
     task: str = "transcribe",
     output_format: str = "text"
 ):
     """Transcribe audio file to text"""
+    if not file:
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No file provided"
+        )
+    
+    # Validate file type
+    if file.content_type not in _AUDIO_MIMES:
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unsupported audio format: {file.content_type}. Supported formats: {_AUDIO_MIMES_STR}"
+        )
+    
+    # Save uploaded file temporarily (max 100MB for audio)
+    file_path = await persist_upload(file, _MAX_AUDIO_BYTES, prefix="transcribe_temp_")
+    
     try:
-        if not file:
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No file provided"
-            )
-        
-        # Validate file type
-        allowed_audio_types = [
-            'audio/wav', 'audio/mp3', 'audio/mpeg', 'audio/ogg', 
-            'audio/flac', 'audio/aac', 'audio/webm', 'audio/m4a'
-        ]
-        
-        if file.content_type not in allowed_audio_types:
-            raise HTTPException(
-                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                detail=f"Unsupported audio format: {file.content_type}. Supported formats: {', '.join(allowed_audio_types)}"
-            )
-        
-        # Save uploaded file temporarily
-        file_path = Path(settings.upload_dir) / f"transcribe_temp_{file.filename}"
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            
-            # Check file size (max 100MB for audio)
-            file_size_mb = len(content) / (1024 * 1024)
-            if file_size_mb > 100:
-                raise HTTPException(
-                    status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail=f"Audio file is too large: {file_size_mb:.1f}MB (max: 100MB)"
-                )
-            
-            await f.write(content)
-        
-        try:
-            # Transcribe audio
-            result = await transcription_service.transcribe_audio_file(
-                str(file_path),
-                output_format=output_format
-            )
-            
-            if not result["success"]:
-                raise HTTPException(
-                    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=result.get("error", "Transcription failed")
-                )
-            
-            return {
-                "success": True,
-                "text": result["text"],
-                "language": result["language"],
-                "task": result["task"],
-                "model": result["model"],
-                "metadata": result.get("metadata", {})
-            }
-            
-        finally:
-            # Clean up temporary file
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file {file_path}: {e}")
-        
-    except HTTPException:
+        # Transcribe audio
+        result = await transcription_service.transcribe_audio_file(
+            str(file_path),
+            output_format=output_format
+        )
+    except BaseException:
+        await run_in_threadpool(_remove_temp_files, [file_path])
         raise
-    except Exception as e:
-        logger.error(f"Transcription error: {e}")
+    
+    if not result["success"]:
+        await run_in_threadpool(_remove_temp_files, [file_path])
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            detail=result.get("error", "Transcription failed")
         )
+    
+    # Clean up temporary file after the response is sent
+    background.add_task(_remove_temp_files, [file_path])
+    
+    return {
+        "success": True,
+        "text": result["text"],
+        "language": result["language"],
+        "task": result["task"],
+        "model": result["model"],
+        "metadata": result.get("metadata", {})
+    }
 
 @router.get("/transcribe/status")
-async def get_transcription_status():
+async def get_transcription_status(request: Request):
     """Get transcription service status"""
+    return _etag_response(request, await _cached_status("transcription", _transcription_status))
+
+def _transcription_status() -> Dict[str, Any]:
     return {
         "service": "hebrew_transcription",
         "model": transcription_service.model_name,
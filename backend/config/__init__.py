@@ -1,3 +1,4 @@
-from .settings import settings
+from .settings import settings, get_settings
+from .logging_config import configure_logging
 
-__all__ = ["settings"]
\ No newline at end of file
+__all__ = ["settings", "get_settings", "configure_logging"]
\ No newline at end of file
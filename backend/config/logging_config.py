@@ -0,0 +1,13 @@
+import logging
+
+LOG_FORMAT = "%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%H:%M:%S"
+
+def configure_logging(level: str = "INFO"):
+    """Configure root logging once; call before importing the services"""
+    root = logging.getLogger()
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(level.upper())
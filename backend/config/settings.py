@@ -1,15 +1,54 @@
-from pydantic_settings import BaseSettings
-from typing import List, Optional, Dict, Any
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict, NoDecode
+from typing import Annotated, List, Literal, Optional, Dict, Any, FrozenSet
+from functools import lru_cache
+import asyncio
+import importlib.util
 import os
 import logging
-from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+def _empty_results() -> Dict[str, Any]:
+    """Fresh results container for a single validation step"""
+    return {"warnings": [], "errors": [], "recommendations": [], "info": [], "environment_info": {}}
+
+def _merge_results(target: Dict[str, Any], partial: Dict[str, Any]):
+    """Merge a validation step's results into the overall results"""
+    for key in ("warnings", "errors", "recommendations", "info"):
+        target[key].extend(partial[key])
+    target["environment_info"].update(partial["environment_info"])
+
+@lru_cache(maxsize=1)
+def _gpu_info() -> Optional[Dict[str, Any]]:
+    """Query CUDA device details once per process (None if PyTorch is not installed)"""
+    try:
+        import torch
+    except ImportError:
+        return None
+    
+    if not torch.cuda.is_available():
+        return {"cuda_available": False}
+    
+    properties = torch.cuda.get_device_properties(0)
+    return {
+        "cuda_available": True,
+        "gpu_count": torch.cuda.device_count(),
+        "gpu_name": properties.name,
+        "gpu_memory_gb": properties.total_memory / 1024**3
+    }
+
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
+
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    log_level: str = "INFO"
+    debug: bool = False  # Auto-reload on code changes (single worker)
+    # Each worker loads its own models and opens the local Qdrant storage, which only
+    # one process can hold; raise this only with a Qdrant server and enough GPU memory
+    api_workers: int = 1
 
     # Vector Store Configuration
     qdrant_path: str = "./storage/qdrant"
@@ -19,10 +58,20 @@ class Settings(BaseSettings):
     dots_ocr_model: str = "rednote-hilab/dots.ocr"
     dots_ocr_fallback_model: str = "microsoft/DialoGPT-medium"  # Fallback if dots.ocr fails
     tesseract_lang: str = "heb+eng"
+    dots_ocr_quantization: Literal["none", "8bit", "4bit"] = "none"  # Weight quantization (needs CUDA + bitsandbytes)
+    dots_ocr_compile: bool = False  # torch.compile the dots.ocr forward pass (CUDA only, slow warm-up)
+    enable_cudnn_benchmark: bool = True  # Let cuDNN autotune kernels for repeated input shapes
+    ocr_batch_size: int = 4  # Max images per batched dots.ocr generate() call
+    ocr_batch_wait_ms: int = 50  # How long to wait for more images before running a batch
+    ocr_rps: float = 0.0  # Max OCR calls per second (0 = unlimited)
+    transcription_rps: float = 0.0  # Max transcription calls per second (0 = unlimited)
+    audio_workers: int = 0  # Whisper worker processes for CPU transcription (0 = in-process; each loads its own model)
+    whisper_quant: Literal["fp32", "bf16", "int8"] = "fp32"  # Whisper weight precision on CPU (GPU always uses fp16)
 
     # LLM Configuration
     llm_model: str = "gpt-oss:20b"  # Default to GPT-OSS for Hebrew
     ollama_host: str = "http://localhost:11434"
+    ollama_num_parallel: int = 4  # Concurrent generations; match the server's OLLAMA_NUM_PARALLEL
 
     # Embedding Configuration (FastEmbed)
     embedding_model: str = "intfloat/multilingual-e5-large"
@@ -32,7 +81,8 @@ class Settings(BaseSettings):
     chunk_size: int = 1000
     chunk_overlap: int = 200
     max_file_size_mb: int = 100
-    supported_extensions: List[str] = [".pdf", ".docx", ".doc", ".txt", ".png", ".jpg", ".jpeg", ".mp3", ".wav", ".m4a", ".flac"]
+    max_concurrent_docs: int = 5  # Documents processed concurrently per upload/scan
+    supported_extensions: FrozenSet[str] = frozenset({".pdf", ".docx", ".doc", ".txt", ".png", ".jpg", ".jpeg", ".mp3", ".wav", ".m4a", ".flac"})
 
     # Storage Configuration
     upload_dir: str = "./storage/uploads"
@@ -42,19 +92,40 @@ class Settings(BaseSettings):
     watch_directory: str = "./storage/watch"  # Directory to monitor for new files
     scan_interval_seconds: int = 3600  # How often to scan for new files
     enable_periodic_indexing: bool = True  # Enable/disable periodic indexing
-    processed_files_db: str = "./storage/processed_files.json"  # Track processed files
+    processed_files_db: str = "./storage/processed_files.sqlite"  # Track processed files (SQLite)
+
+    # Query Cache Configuration
+    query_cache_enabled: bool = True  # Cache answers to repeated/similar questions
+    query_cache_size: int = 1024  # Max cached answers
+    query_cache_ttl_seconds: int = 600  # How long a cached answer stays valid
+    semantic_cache_threshold: float = 0.95  # Min cosine similarity for a semantic hit
+    semantic_cache_min_length: int = 10  # Shorter questions only use exact matching
+
+    # Extraction Cache Configuration
+    extraction_cache_enabled: bool = True  # Reuse PDF/OCR/transcription output for identical files
+    extraction_cache_dir: str = "./storage/extraction_cache"
+    extraction_cache_max_entries: int = 2048  # Least recently used entries are evicted beyond this
 
     # Hebrew Language Settings
     hebrew_text_direction: str = "rtl"
     hebrew_tokenizer: bool = True
 
-    # CORS Configuration
-    cors_origins: str = "http://localhost:3000,http://localhost:5173,http://localhost:8080"
+    # CORS Configuration (comma-separated in the environment)
+    cors_origins: Annotated[List[str], NoDecode] = ["http://localhost:3000", "http://localhost:5173", "http://localhost:8080"]
+
+    @field_validator("supported_extensions", mode="before")
+    @classmethod
+    def _lowercase_extensions(cls, value):
+        """Store extensions lowercased so lookups only need to lowercase the file suffix"""
+        return frozenset(ext.lower() for ext in value)
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Convert comma-separated CORS origins to list"""
-        return [origin.strip() for origin in self.cors_origins.split(",")]
+    @field_validator("cors_origins", mode="before")
+    @classmethod
+    def _split_cors_origins(cls, value):
+        """Split comma-separated CORS origins once, at load time"""
+        if isinstance(value, str):
+            return [origin.strip() for origin in value.split(",") if origin.strip()]
+        return value
     
     async def validate_configuration(self) -> Dict[str, Any]:
         """Validate configuration and environment"""
@@ -68,17 +139,19 @@ class Settings(BaseSettings):
         }
         
         try:
-            # Check storage directories
-            await self._validate_storage_directories(validation_results)
-            
-            # Check model availability
-            await self._validate_models(validation_results)
-            
-            # Check environment
-            await self._validate_environment(validation_results)
+            # Run the independent checks concurrently (storage directories, models,
+            # environment, dependencies); each gets its own results dict to avoid
+            # interleaved appends, merged below in a stable order
+            partial_results = [_empty_results() for _ in range(4)]
+            await asyncio.gather(
+                self._validate_storage_directories(partial_results[0]),
+                self._validate_models(partial_results[1]),
+                self._validate_environment(partial_results[2]),
+                self._validate_dependencies(partial_results[3])
+            )
             
-            # Check dependencies
-            await self._validate_dependencies(validation_results)
+            for partial in partial_results:
+                _merge_results(validation_results, partial)
             
             # Determine overall status (ignore optional dependency warnings)
             critical_warnings = [w for w in validation_results["warnings"] if "optional dependency" not in w]
@@ -107,15 +180,13 @@ class Settings(BaseSettings):
         
         for directory in directories:
             try:
-                path = Path(directory)
-                if not path.exists():
-                    path.mkdir(parents=True, exist_ok=True)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory, exist_ok=True)
                     results["warnings"].append(f"Created missing directory: {directory}")
                 
-                # Test write access
-                test_file = path / ".test_write"
-                test_file.write_text("test")
-                test_file.unlink()
+                # Check write access without creating/removing a probe file
+                if not os.access(directory, os.W_OK):
+                    results["errors"].append(f"Directory {directory} is not writable")
                 
             except Exception as e:
                 results["errors"].append(f"Directory {directory} is not writable: {str(e)}")
@@ -149,47 +220,62 @@ class Settings(BaseSettings):
             if sys.version_info < (3, 8):
                 results["errors"].append("Python 3.8+ is required")
             
-            # Check CUDA availability
-            try:
-                import torch
-                cuda_available = torch.cuda.is_available()
-                results["environment_info"]["cuda_available"] = cuda_available
-                
-                if cuda_available:
-                    gpu_count = torch.cuda.device_count()
-                    gpu_name = torch.cuda.get_device_name(0)
-                    gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
-                    
-                    results["environment_info"]["gpu_count"] = gpu_count
-                    results["environment_info"]["gpu_name"] = gpu_name
-                    results["environment_info"]["gpu_memory_gb"] = f"{gpu_memory:.1f}"
-                    
-                    if gpu_memory < 8:
-                        results["warnings"].append(f"Low GPU memory ({gpu_memory:.1f}GB). Consider using CPU or smaller models.")
-                    else:
-                        results["recommendations"].append("GPU detected - optimal for dots.ocr processing")
-                else:
-                    results["warnings"].append("CUDA not available - dots.ocr will use CPU (slower)")
-                    
-            except ImportError:
-                results["warnings"].append("PyTorch not available - CUDA check skipped")
-            
-            # Check system memory
-            try:
-                import psutil
-                memory = psutil.virtual_memory()
-                memory_gb = memory.total / 1024**3
-                results["environment_info"]["system_memory_gb"] = f"{memory_gb:.1f}"
-                
-                if memory_gb < 8:
-                    results["warnings"].append(f"Low system memory ({memory_gb:.1f}GB). Consider increasing RAM.")
-                    
-            except ImportError:
-                results["warnings"].append("psutil not available - memory check skipped")
+            # Check CUDA availability and system memory in parallel threads; both
+            # are dominated by importing and loading native libraries
+            torch_results, psutil_results = await asyncio.gather(
+                asyncio.to_thread(self._probe_torch),
+                asyncio.to_thread(self._probe_psutil)
+            )
+            _merge_results(results, torch_results)
+            _merge_results(results, psutil_results)
                 
         except Exception as e:
             results["warnings"].append(f"Environment validation warning: {str(e)}")
     
+    @staticmethod
+    def _probe_torch() -> Dict[str, Any]:
+        """Check CUDA availability (blocking)"""
+        results = _empty_results()
+        gpu_info = _gpu_info()
+        if gpu_info is None:
+            results["warnings"].append("PyTorch not available - CUDA check skipped")
+            return results
+        
+        cuda_available = gpu_info["cuda_available"]
+        results["environment_info"]["cuda_available"] = cuda_available
+        
+        if cuda_available:
+            gpu_memory = gpu_info["gpu_memory_gb"]
+            
+            results["environment_info"]["gpu_count"] = gpu_info["gpu_count"]
+            results["environment_info"]["gpu_name"] = gpu_info["gpu_name"]
+            results["environment_info"]["gpu_memory_gb"] = f"{gpu_memory:.1f}"
+            
+            if gpu_memory < 8:
+                results["warnings"].append(f"Low GPU memory ({gpu_memory:.1f}GB). Consider using CPU or smaller models.")
+            else:
+                results["recommendations"].append("GPU detected - optimal for dots.ocr processing")
+        else:
+            results["warnings"].append("CUDA not available - dots.ocr will use CPU (slower)")
+        return results
+    
+    @staticmethod
+    def _probe_psutil() -> Dict[str, Any]:
+        """Check system memory (blocking)"""
+        results = _empty_results()
+        try:
+            import psutil
+            memory = psutil.virtual_memory()
+            memory_gb = memory.total / 1024**3
+            results["environment_info"]["system_memory_gb"] = f"{memory_gb:.1f}"
+            
+            if memory_gb < 8:
+                results["warnings"].append(f"Low system memory ({memory_gb:.1f}GB). Consider increasing RAM.")
+                
+        except ImportError:
+            results["warnings"].append("psutil not available - memory check skipped")
+        return results
+    
     async def _validate_dependencies(self, results: Dict[str, Any]):
         """Validate required dependencies"""
         import platform
@@ -209,23 +295,28 @@ class Settings(BaseSettings):
         optional_dependencies = {
             "flash_attn": "Flash attention for faster inference (optional)",
             "librosa": "Audio processing",
+            "torchaudio": "Fast audio decoding and resampling (optional)",
             "psutil": "System monitoring"
         }
         
+        # Probe with find_spec so heavy packages (torch, transformers, ...) are located
+        # without executing their module code
         for package, description in dependencies.items():
             try:
-                __import__(package)
+                if importlib.util.find_spec(package) is None:
+                    raise ImportError(package)
                 results["environment_info"][f"{package}_available"] = True
-            except ImportError:
+            except (ImportError, ValueError):
                 results["warnings"].append(f"Missing dependency: {package} ({description})")
                 results["environment_info"][f"{package}_available"] = False
         
         # Check optional dependencies
         for package, description in optional_dependencies.items():
             try:
-                __import__(package)
+                if importlib.util.find_spec(package) is None:
+                    raise ImportError(package)
                 results["environment_info"][f"{package}_available"] = True
-            except ImportError:
+            except (ImportError, ValueError):
                 if package == "flash_attn" and is_mac:
                     results["info"].append("flash_attn not available on macOS (CUDA-only)")
                     results["environment_info"][f"{package}_available"] = False
@@ -233,15 +324,11 @@ class Settings(BaseSettings):
                     results["warnings"].append(f"Missing optional dependency: {package} ({description})")
                     results["environment_info"][f"{package}_available"] = False
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, reading .env only once"""
+    return Settings()
 
-settings = Settings()
 
-# Create directories if they don't exist
-os.makedirs(settings.upload_dir, exist_ok=True)
-os.makedirs(settings.qdrant_path, exist_ok=True)
-os.makedirs(settings.vector_db_dir, exist_ok=True)
-os.makedirs(settings.watch_directory, exist_ok=True)
+settings = get_settings()
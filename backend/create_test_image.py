@@ -4,8 +4,25 @@ Create a test image with Hebrew text for OCR verification
 """
 
 from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
 import os
 
+TEXT_SPACING = 4
+
+@lru_cache(maxsize=4)
+def _load_font(path: str = "/System/Library/Fonts/Arial.ttf", size: int = 24):
+    """Load a font once per (path, size), falling back to the default font"""
+    try:
+        # Try to use a Hebrew font if available
+        return ImageFont.truetype(path, size)
+    except:
+        try:
+            # Fallback to default font
+            return ImageFont.load_default()
+        except:
+            # Last resort - use default
+            return None
+
 def create_hebrew_test_image():
     """Create a test image with Hebrew text"""
     
@@ -21,19 +38,10 @@ def create_hebrew_test_image():
 ולהמיר אותו לטקסט דיגיטלי
 """
     
-    try:
-        # Try to use a Hebrew font if available
-        font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 24)
-    except:
-        try:
-            # Fallback to default font
-            font = ImageFont.load_default()
-        except:
-            # Last resort - use default
-            font = None
+    font = _load_font()
     
-    # Draw text
-    text_bbox = draw.textbbox((0, 0), hebrew_text, font=font)
+    # Measure the text block once
+    text_bbox = draw.multiline_textbbox((0, 0), hebrew_text, font=font, spacing=TEXT_SPACING)
     text_width = text_bbox[2] - text_bbox[0]
     text_height = text_bbox[3] - text_bbox[1]
     
@@ -41,7 +49,7 @@ def create_hebrew_test_image():
     x = (width - text_width) // 2
     y = (height - text_height) // 2
     
-    draw.text((x, y), hebrew_text, fill='black', font=font)
+    draw.multiline_text((x, y), hebrew_text, fill='black', font=font, spacing=TEXT_SPACING)
     
     # Save the image
     output_path = "test_hebrew_image.png"
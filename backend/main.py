@@ -1,22 +1,29 @@
+import asyncio
+import os
+
+# Defer loading CUDA kernels until they are first used; must be set before torch is imported
+os.environ.setdefault("CUDA_MODULE_LOADING", "LAZY")
+
 import logging
 import uvicorn
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+
+from config import settings, configure_logging
+
+# Configure logging before the services are imported so they log with the same format
+configure_logging(settings.log_level)
 
-from config import settings
 from api.routes import router
 from services.rag_agent import rag_service
 from services.periodic_indexer import periodic_indexer
 from services.transcription_service import transcription_service
+from services.llm_service import hebrew_llm_service
+from services.document_processor import shutdown_pdf_pool
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # Lifespan context manager for startup/shutdown
@@ -48,19 +55,40 @@ async def lifespan(app: FastAPI):
         
         logger.info("Configuration validation completed successfully")
         
-        # Initialize services
-        await rag_service.initialize()
-        logger.info("RAG service initialized successfully")
+        # Initialize services concurrently; the indexer is only started once
+        # everything (in particular the RAG service it feeds) is ready
+        services = {
+            "RAG service": rag_service,
+            "Transcription service": transcription_service,
+            "Periodic indexer": periodic_indexer
+        }
+        results = await asyncio.gather(
+            *(service.initialize() for service in services.values()),
+            return_exceptions=True
+        )
         
-        # Initialize transcription service
-        await transcription_service.initialize()
-        logger.info("Transcription service initialized successfully")
+        failures = []
+        for name, result in zip(services, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{name} failed to initialize: {result}")
+                failures.append(result)
+            else:
+                logger.info(f"{name} initialized successfully")
+        if failures:
+            raise failures[0]
         
-        # Initialize and start periodic indexer
-        await periodic_indexer.initialize()
         await periodic_indexer.start()
         logger.info("Periodic indexer started successfully")
         
+        if settings.enable_cudnn_benchmark:
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.backends.cudnn.benchmark = True
+                    logger.info("cuDNN benchmark mode enabled")
+            except ImportError:
+                pass
+        
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         raise
@@ -76,6 +104,12 @@ async def lifespan(app: FastAPI):
         await transcription_service.close()
         logger.info("Transcription service stopped")
         
+        await hebrew_llm_service.close()
+        logger.info("LLM service stopped")
+        
+        shutdown_pdf_pool()
+        logger.info("PDF worker processes stopped")
+        
     except Exception as e:
         logger.error(f"Error stopping services: {e}")
 
@@ -86,13 +120,14 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -126,7 +161,7 @@ async def root():
 async def global_exception_handler(request, exc):
     """Global exception handler"""
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -136,6 +171,9 @@ if __name__ == "__main__":
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True,
+        reload=settings.debug,
+        workers=1 if settings.debug else settings.api_workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
@@ -1,7 +1,27 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from typing_extensions import TypedDict  # pydantic requires it over typing.TypedDict before 3.12
 from enum import Enum
 
+# Known-shape payloads are declared as TypedDicts so they serialize field by field
+# instead of going through Any inference for every value
+class QueryMetadata(TypedDict, total=False):
+    model_used: str
+    search_performed: bool
+
+class CollectionStats(TypedDict, total=False):
+    total_documents: int
+    vector_size: int
+    distance_metric: str
+
+class IndexerStatus(TypedDict, total=False):
+    enabled: bool
+    running: bool
+    watch_directory: str
+    scan_interval: int
+    processed_files_count: int
+    last_scan: Optional[str]
+
 class QueryRequest(BaseModel):
     question: str = Field(..., description="The question to ask the RAG system")
     stream: bool = Field(False, description="Whether to stream the response")
@@ -10,7 +30,7 @@ class QueryResponse(BaseModel):
     success: bool
     response: Optional[str] = None
     error: Optional[str] = None
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[QueryMetadata] = None
 
 class DocumentUploadResponse(BaseModel):
     success: bool
@@ -24,7 +44,7 @@ class DocumentUploadResponse(BaseModel):
 
 class StatsResponse(BaseModel):
     success: bool
-    stats: Dict[str, Any]
+    stats: CollectionStats
     error: Optional[str] = None
 
 class ClearResponse(BaseModel):
@@ -41,7 +61,7 @@ class HealthResponse(BaseModel):
 class IndexerStatusResponse(BaseModel):
     """Response model for indexer status"""
     success: bool
-    status: Dict[str, Any]
+    status: IndexerStatus
 
 class IndexerControlResponse(BaseModel):
     """Response model for indexer control operations"""
@@ -49,6 +69,9 @@ class IndexerControlResponse(BaseModel):
     message: str
 
 __all__ = [
+    "QueryMetadata",
+    "CollectionStats",
+    "IndexerStatus",
     "QueryRequest",
     "QueryResponse", 
     "DocumentUploadResponse",
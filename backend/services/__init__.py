@@ -1,22 +1,43 @@
-from .ocr_service import ocr_service
-from .vector_store_service import vector_service  
-from .llm_service import hebrew_llm_service
-from .document_processor import document_processor
-from .rag_agent import rag_service
+import importlib
 
-# Initialize transcription service
-try:
-    from .transcription_service import HebrewTranscriptionService
-    transcription_service = HebrewTranscriptionService()
-    # Note: transcription_service.initialize() will be called when needed
-except ImportError:
-    transcription_service = None
+# Services are resolved on first access (PEP 562) so importing one service module,
+# or the package itself, doesn't load every model library up front
+_LAZY = {
+    "ocr_service": (".ocr_service", "ocr_service"),
+    "vector_service": (".vector_store_service", "vector_service"),
+    "hebrew_llm_service": (".llm_service", "hebrew_llm_service"),
+    "document_processor": (".document_processor", "document_processor"),
+    "rag_service": (".rag_agent", "rag_service"),
+    "semantic_cache": (".semantic_cache", "semantic_cache"),
+    "extraction_cache": (".extraction_cache", "extraction_cache"),
+    "transcription_service": (".transcription_service", "transcription_service")
+}
+
+# Optional services resolve to None when their dependencies are missing
+_OPTIONAL = {"transcription_service"}
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attr = _LAZY[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except ImportError:
+        if name not in _OPTIONAL:
+            raise
+        value = None
+
+    globals()[name] = value
+    return value
 
 __all__ = [
     "ocr_service",
-    "vector_service", 
+    "vector_service",
     "hebrew_llm_service",
     "document_processor",
     "rag_service",
+    "semantic_cache",
+    "extraction_cache",
     "transcription_service"
-]
\ No newline at end of file
+]
@@ -1,15 +1,23 @@
 import logging
 import asyncio
+import io
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Union, Tuple, BinaryIO, Callable, Awaitable
 import mimetypes
 import hashlib
 
-# Document processing imports
-import PyPDF2
-import fitz  # PyMuPDF
-from docx import Document as DocxDocument
-from PIL import Image
+# Document parsing libraries (PyMuPDF, PyPDF2, python-docx, Pillow) are imported where
+# they are used, so workloads that never touch a format don't pay for loading it
 
 # LangChain imports
 from langchain_core.documents import Document
@@ -24,9 +32,268 @@ except ImportError:
 
 from config import settings
 from services.ocr_service import ocr_service
+from services.extraction_cache import extraction_cache
 
 logger = logging.getLogger(__name__)
 
+# Large PDFs are split into fixed-size page segments, each cached by the hash of its
+# pages' content streams and resources and extracted in worker processes (PyMuPDF holds the GIL);
+# more than ~6 workers stops paying off
+PDF_WORKERS = min(os.cpu_count() or 1, 6)
+PDF_PARALLEL_MIN_PAGES = 32  # Smaller documents aren't worth the IPC round-trip
+PDF_SEGMENT_PAGES = 15
+PDF_OCR_DPI = 200  # Resolution for rasterizing scanned pages before OCR
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+def _read_pdf_pages(doc, start: int, stop: int) -> List[Tuple[int, Optional[str]]]:
+    """Extract (page_number, text) for pages [start, stop) of an open PyMuPDF document
+
+    Pages without a text layer but with images (scanned pages) get None as their text
+    so the caller can OCR them.
+    """
+    pages = []
+    for page_num in range(start, stop):
+        try:
+            page = doc[page_num]
+            # Text blocks only (block type 0); image blocks carry no text
+            text = "\n".join(block[4] for block in page.get_text("blocks") if block[6] == 0)
+            if not text.strip() and page.get_images():
+                text = None
+        except Exception as e:
+            # One unreadable page shouldn't fail the whole document
+            logger.warning(f"Failed to extract text from PDF page {page_num + 1}: {e}")
+            text = ""
+        pages.append((page_num + 1, text))
+    return pages
+
+# Indirect references in a PDF object's source, with the key they're stored under (if any)
+_PDF_REFERENCE = re.compile(r"(?:/(\w+)\s*)?\b(\d+) \d+ R\b")
+
+def _hash_pdf_objects(doc, xrefs: List[int], hasher, seen: set):
+    """Hash PDF objects and everything they reference (fonts, ToUnicode maps, nested forms, ...)
+
+    Object numbers are left out of the hash, since identical content gets different numbers
+    in different files; traversal order keeps the structure in the hash instead.
+    """
+    pending = list(reversed(xrefs))
+    while pending:
+        xref = pending.pop()
+        if xref in seen or xref <= 0:
+            continue
+        seen.add(xref)
+        source = doc.xref_object(xref, compressed=True)
+        hasher.update(_PDF_REFERENCE.sub(lambda m: f"/{m.group(1)} R" if m.group(1) else "R", source).encode())
+        hasher.update(b"\0")
+        # Image samples don't change the text layer, and are too big to hash for nothing
+        if doc.xref_is_stream(xref) and doc.xref_get_key(xref, "Subtype") != ("name", "/Image"):
+            hasher.update(doc.xref_stream_raw(xref) or b"")
+            hasher.update(b"\0")
+        # Don't climb back up the page tree
+        pending.extend(int(m.group(2)) for m in reversed(list(_PDF_REFERENCE.finditer(source))) if m.group(1) != "Parent")
+
+def _pdf_segments(doc, page_count: int) -> List[Tuple[int, int, str]]:
+    """Split a document into (start, stop, content_hash) page segments
+
+    Each page contributes its content streams and its resolved resources: the same
+    content stream can draw different text with different fonts or Form XObjects.
+    """
+    segments = []
+    for start in range(0, page_count, PDF_SEGMENT_PAGES):
+        stop = min(start + PDF_SEGMENT_PAGES, page_count)
+        hasher = hashlib.blake2b(digest_size=20)
+        seen = set()
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            hasher.update(page.read_contents())
+            hasher.update(b"\0")
+            # Resource lists are resolved through inherited resources and nested forms
+            resources = (
+                [font[0] for font in page.get_fonts(full=True)]
+                + [xobject[0] for xobject in page.get_xobjects()]
+                + [image[0] for image in page.get_images(full=True)]
+            )
+            _hash_pdf_objects(doc, resources, hasher, seen)
+            hasher.update(b"\1")
+        segments.append((start, stop, hasher.hexdigest()))
+    return segments
+
+def _extract_pdf_segments(source: Union[str, bytes], segments: List[Tuple[int, int]]) -> List[List[Tuple[int, Optional[str]]]]:
+    """Process pool worker: open the PDF (path or bytes) once and extract several page ranges"""
+    import fitz  # PyMuPDF
+    
+    with fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source) as doc:
+        return [_read_pdf_pages(doc, start, stop) for start, stop in segments]
+
+def _render_pdf_pages(file_path: Path, data: Optional[bytes], page_numbers: List[int], output_dir: Path) -> List[Path]:
+    """Rasterize the given (1-based) pages to PNG files for OCR"""
+    image_paths = []
+    with _open_pdf(file_path, data) as doc:
+        for page_num in page_numbers:
+            image_path = output_dir / f"page_{page_num}.png"
+            doc[page_num - 1].get_pixmap(dpi=PDF_OCR_DPI).save(str(image_path))
+            image_paths.append(image_path)
+    return image_paths
+
+# OCR/transcription retries for transient failures (GPU OOM, timeouts, rate limits)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+_TRANSIENT_ERROR_MARKERS = (
+    "out of memory", "timeout", "timed out", "429", "rate limit", "quota",
+    "temporarily unavailable", "connection"
+)
+
+def _is_transient(error: Any) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _TRANSIENT_ERROR_MARKERS)
+
+class RateLimiter:
+    """Spaces out calls to at most `rps` per second (a rate of 0 disables limiting)"""
+    
+    def __init__(self, rps: float):
+        self._interval = 1 / rps if rps > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if not self._interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+ocr_rate_limiter = RateLimiter(settings.ocr_rps)
+transcription_rate_limiter = RateLimiter(settings.transcription_rps)
+
+async def _call_with_retry(
+    func: Callable[..., Awaitable[Dict[str, Any]]],
+    *args,
+    rate_limiter: Optional[RateLimiter] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """Call an OCR/transcription coroutine, retrying transient failures with jittered exponential backoff"""
+    for attempt in range(RETRY_ATTEMPTS):
+        final_attempt = attempt == RETRY_ATTEMPTS - 1
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        try:
+            result = await func(*args, **kwargs)
+            if result.get("success") or final_attempt or not _is_transient(result.get("error", "")):
+                return result
+            error = result.get("error")
+        except Exception as e:
+            if final_attempt or not _is_transient(e):
+                raise
+            error = e
+        
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        logger.warning(f"Transient failure in {func.__name__} ({error}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+def _open_pdf(file_path: Path, data: Optional[bytes]):
+    import fitz  # PyMuPDF
+    
+    return fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(file_path)
+
+def _pymupdf_extract(file_path: Path, data: Optional[bytes]) -> Tuple[int, Optional[List[Tuple[int, Optional[str]]]], Optional[List[Tuple[int, int, str]]]]:
+    """Open a PDF with PyMuPDF and extract it in-place, or segment it if it's big enough for the process pool"""
+    with _open_pdf(file_path, data) as doc:
+        page_count = len(doc)
+        if page_count >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1:
+            return page_count, None, _pdf_segments(doc, page_count)
+        return page_count, _read_pdf_pages(doc, 0, page_count), None
+
+def _pypdf2_extract(file_path: Path, data: Optional[bytes]) -> Tuple[int, List[Tuple[int, str]]]:
+    """Extract (page_number, text) pairs with PyPDF2"""
+    import PyPDF2
+    
+    with (io.BytesIO(data) if data is not None else open(file_path, 'rb')) as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return len(pdf_reader.pages), [
+            (page_num + 1, page.extract_text()) for page_num, page in enumerate(pdf_reader.pages)
+        ]
+
+def _docx_paragraphs(file_path: Path, data: Optional[bytes]) -> List[str]:
+    """Non-empty paragraph texts of a DOCX document"""
+    from docx import Document as DocxDocument
+    
+    doc = DocxDocument(io.BytesIO(data) if data is not None else file_path)
+    return [para.text for para in doc.paragraphs if para.text.strip()]
+
+def _decode_image(data: bytes) -> Any:
+    from PIL import Image
+    
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+def _read_text(file_path: Path, data: Optional[bytes]) -> str:
+    if data is not None:
+        return data.decode('utf-8')
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # Spawn rather than fork: by the time the pool is first needed the server has
+        # threads (asyncio, torch) whose held locks a forked worker would inherit
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_pool
+
+async def _run_in_pdf_pool(func: Callable, *args) -> Any:
+    """Run a function in the PDF process pool, replacing the pool if a worker crashed"""
+    global _pdf_pool
+    pool = _get_pdf_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # A worker that died (e.g. MuPDF crashing on a malformed file) breaks the whole
+        # pool; later documents get a fresh one
+        if _pdf_pool is pool:
+            logger.warning("PDF process pool broke, it will be recreated")
+            _pdf_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def shutdown_pdf_pool():
+    """Stop the PDF worker processes (on application shutdown)"""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+_HEBREW_RE = re.compile(r"[\u0590-\u05FF]")
+
+_EXT_TO_TYPE_LOWER = {
+    '.pdf': 'pdf',
+    '.docx': 'docx',
+    '.doc': 'doc',
+    '.txt': 'txt',
+    '.png': 'image',
+    '.jpg': 'image',
+    '.jpeg': 'image',
+    '.tiff': 'image',
+    '.bmp': 'image',
+    '.mp3': 'audio',
+    '.wav': 'audio',
+    '.m4a': 'audio',
+    '.flac': 'audio'
+}
+# Upper-case variants are pre-populated so the common cases skip lower()
+_EXT_TO_TYPE = MappingProxyType({
+    **_EXT_TO_TYPE_LOWER,
+    **{ext.upper(): file_type for ext, file_type in _EXT_TO_TYPE_LOWER.items()}
+})
+
 class HebrewTextSplitter:
     """Enhanced text splitter for Hebrew documents"""
     
@@ -38,6 +305,10 @@ class HebrewTextSplitter:
         if HEBREW_TOKENIZER_AVAILABLE:
             self.hebrew_tokenizer = Tokenizer()
         
+        # The splitter measures the same candidate pieces repeatedly while merging
+        # splits, so token counts are memoized per text
+        self._hebrew_token_count = lru_cache(maxsize=8192)(self._count_hebrew_tokens)
+        
         # Initialize LangChain text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
@@ -56,23 +327,53 @@ class HebrewTextSplitter:
             ]
         )
     
+    def _count_hebrew_tokens(self, text: str) -> int:
+        # tokenize() may yield lazily, so count without materializing a list
+        return sum(1 for _ in self.hebrew_tokenizer.tokenize(text))
+    
     def _hebrew_aware_length(self, text: str) -> int:
         """Calculate text length considering Hebrew characters"""
-        if self.hebrew_tokenizer and any('\u0590' <= c <= '\u05FF' for c in text):
+        if self.hebrew_tokenizer and _HEBREW_RE.search(text):
             # Use Hebrew tokenizer for Hebrew text
-            tokens = self.hebrew_tokenizer.tokenize(text)
-            return len(tokens)
+            return self._hebrew_token_count(text)
         else:
             # Use standard length for non-Hebrew text
             return len(text)
     
     def split_text(self, text: str, metadata: Optional[Dict] = None) -> List[Document]:
         """Split text into chunks with Hebrew awareness"""
-        # Create a document from the text
-        doc = Document(page_content=text, metadata=metadata or {})
+        return self.split_parts([("text", text)], metadata)
+    
+    def split_parts(self, parts: List[Tuple[str, str]], metadata: Optional[Dict] = None) -> List[Document]:
+        """Split (kind, text) document elements into chunks
+        
+        Consecutive text elements are split together; tables and formulas become
+        chunks of their own so they are never cut in the middle (unless a single one
+        exceeds the chunk size).
+        """
+        metadata = metadata or {}
+        chunks = []
+        text_run = []
+        
+        def flush_text():
+            if text_run:
+                doc = Document(page_content="".join(text_run), metadata=metadata)
+                chunks.extend(self.text_splitter.split_documents([doc]))
+                text_run.clear()
         
-        # Split using LangChain splitter
-        chunks = self.text_splitter.split_documents([doc])
+        for kind, text in parts:
+            if kind == "text":
+                text_run.append(text)
+                continue
+            
+            flush_text()
+            element_metadata = {**metadata, "element_kind": kind}
+            text = text.strip()
+            if self._hebrew_aware_length(text) <= self.chunk_size:
+                chunks.append(Document(page_content=text, metadata=element_metadata))
+            else:
+                chunks.extend(self.text_splitter.split_documents([Document(page_content=text, metadata=element_metadata)]))
+        flush_text()
         
         # Add chunk metadata
         for i, chunk in enumerate(chunks):
@@ -88,8 +389,8 @@ class PDFProcessor:
     """PDF document processor"""
     
     @staticmethod
-    async def extract_text(file_path: Path) -> Dict[str, Any]:
-        """Extract text from PDF file"""
+    async def extract_text(file_path: Path, data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Extract text from PDF file (or from its in-memory bytes when data is given)"""
         try:
             text_content = []
             metadata = {
@@ -98,42 +399,45 @@ class PDFProcessor:
                 "pages": 0
             }
             
+            # Parsing is blocking, so it runs in a worker thread (or the PDF process pool)
             # Try PyMuPDF first (better for complex layouts)
             try:
-                doc = fitz.open(file_path)
-                metadata["pages"] = len(doc)
-                
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    text = page.get_text()
-                    if text.strip():
-                        text_content.append({
-                            "page": page_num + 1,
-                            "content": text
-                        })
-                doc.close()
+                page_count, pages, segments = await asyncio.to_thread(_pymupdf_extract, file_path, data)
+                if pages is None:
+                    pages = await PDFProcessor._extract_segments(
+                        data if data is not None else str(file_path), segments, metadata
+                    )
                 
             except Exception as e:
                 logger.warning(f"PyMuPDF failed for {file_path}, trying PyPDF2: {e}")
                 
                 # Fallback to PyPDF2
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    metadata["pages"] = len(pdf_reader.pages)
-                    
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        text = page.extract_text()
-                        if text.strip():
-                            text_content.append({
-                                "page": page_num + 1,
-                                "content": text
-                            })
+                page_count, pages = await asyncio.to_thread(_pypdf2_extract, file_path, data)
+            
+            metadata["pages"] = page_count
+            
+            # Scanned pages have no text layer; OCR them instead of dropping them
+            scanned_pages = [page_num for page_num, text in pages if text is None]
+            ocr_texts = await PDFProcessor._ocr_pages(file_path, data, scanned_pages) if scanned_pages else {}
+            if scanned_pages:
+                metadata["ocr_pages"] = len(ocr_texts)
+            
+            for page_num, text in pages:
+                if text is None:
+                    text = ocr_texts.get(page_num, "")
+                if text.strip():
+                    text_content.append({
+                        "page": page_num,
+                        "content": text
+                    })
             
             return {
                 "success": True,
                 "content": text_content,
                 "metadata": metadata,
-                "error": None
+                "error": None,
+                # OCR failures may be transient: don't let the cache pin a result with pages missing
+                "cacheable": len(ocr_texts) == len(scanned_pages)
             }
             
         except Exception as e:
@@ -144,29 +448,81 @@ class PDFProcessor:
                 "metadata": metadata,
                 "error": str(e)
             }
+    
+    @staticmethod
+    async def _ocr_pages(file_path: Path, data: Optional[bytes], page_numbers: List[int]) -> Dict[int, str]:
+        """OCR scanned pages, returning page_number -> text for the pages that succeeded"""
+        temp_dir = tempfile.mkdtemp(prefix="pdf_ocr_")
+        try:
+            # Rasterizing holds the GIL, so it runs in the PDF process pool
+            image_paths = await _run_in_pdf_pool(
+                _render_pdf_pages, file_path, data, page_numbers, Path(temp_dir)
+            )
+            results = await asyncio.gather(*(
+                _call_with_retry(
+                    ocr_service.extract_text_from_image, image_path, task_type="ocr_only", rate_limiter=ocr_rate_limiter
+                )
+                for image_path in image_paths
+            ), return_exceptions=True)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, temp_dir, True)
+        
+        ocr_texts = {}
+        for page_num, result in zip(page_numbers, results):
+            if isinstance(result, Exception) or not result["success"]:
+                error = result if isinstance(result, Exception) else result.get("error")
+                logger.warning(f"OCR failed for scanned PDF page {page_num} of {file_path}: {error}")
+                continue
+            ocr_texts[page_num] = result["text"]
+        return ocr_texts
+    
+    @staticmethod
+    async def _extract_segments(source: Union[str, bytes], segments: List[Tuple[int, int, str]], metadata: Dict[str, Any]) -> List[Tuple[int, Optional[str]]]:
+        """Extract page segments, reusing cached ones and spreading the rest across the PDF process pool"""
+        keys = [extraction_cache.derived_key(digest, "pdfseg") for _, _, digest in segments]
+        cached = await asyncio.gather(*(extraction_cache.get(key) for key in keys))
+        
+        results: Dict[int, List] = {}
+        missing = []
+        for (start, stop, _), key, entry in zip(segments, keys, cached):
+            if entry is not None:
+                # Entries hold page texts only: the same segment can sit at any offset in another PDF
+                results[start] = [(start + offset + 1, text) for offset, text in enumerate(entry["texts"])]
+            else:
+                missing.append((start, stop, key))
+        
+        if missing:
+            # One task per worker, each opening the document once for its share of segments
+            buckets = [missing[i::PDF_WORKERS] for i in range(min(PDF_WORKERS, len(missing)))]
+            extracted = await asyncio.gather(*(
+                _run_in_pdf_pool(_extract_pdf_segments, source, [(start, stop) for start, stop, _ in bucket])
+                for bucket in buckets
+            ))
+            
+            for bucket, bucket_pages in zip(buckets, extracted):
+                for (start, _, key), pages in zip(bucket, bucket_pages):
+                    results[start] = pages
+                    await extraction_cache.put(key, {"texts": [text for _, text in pages]})
+        
+        metadata["segments"] = len(segments)
+        metadata["segments_cached"] = len(segments) - len(missing)
+        return [page for start in sorted(results) for page in results[start]]
 
 class DocxProcessor:
     """DOCX document processor"""
     
     @staticmethod
-    async def extract_text(file_path: Path) -> Dict[str, Any]:
-        """Extract text from DOCX file"""
+    async def extract_text(file_path: Path, data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Extract text from DOCX file (or from its in-memory bytes when data is given)"""
         try:
-            doc = DocxDocument(file_path)
+            text_content = await asyncio.to_thread(_docx_paragraphs, file_path, data)
             
-            text_content = []
             metadata = {
                 "file_type": "docx",
                 "file_path": str(file_path),
-                "paragraphs": 0
+                "paragraphs": len(text_content)
             }
             
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_content.append(para.text)
-            
-            metadata["paragraphs"] = len(text_content)
-            
             return {
                 "success": True,
                 "content": [{"content": "\n".join(text_content)}],
@@ -187,11 +543,16 @@ class ImageProcessor:
     """Image processor using OCR with layout awareness"""
     
     @staticmethod
-    async def extract_text(file_path: Path) -> Dict[str, Any]:
-        """Extract text from image using OCR with layout information"""
+    async def extract_text(file_path: Path, data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Extract text from image using OCR with layout information (decoding in-memory bytes when data is given)"""
         try:
+            # In-memory uploads are decoded directly instead of being spilled to disk and read back
+            image = await asyncio.to_thread(_decode_image, data) if data is not None else file_path
+            
             # Use OCR service to extract text with layout information
-            ocr_result = await ocr_service.extract_text_from_image(file_path, task_type="full")
+            ocr_result = await _call_with_retry(
+                ocr_service.extract_text_from_image, image, task_type="full", rate_limiter=ocr_rate_limiter
+            )
             
             metadata = {
                 "file_type": "image",
@@ -212,10 +573,12 @@ class ImageProcessor:
                     # Process structured layout data
                     layout_elements = layout_data.get("elements", [])
                     
-                    # Group elements by type for better processing
+                    # Group elements by type in one pass (keeping reading order within
+                    # each group), collecting text categories along the way
                     text_elements = []
                     table_elements = []
                     formula_elements = []
+                    text_categories = set()
                     
                     for element in layout_elements:
                         element_type = element.get("category", "Text")
@@ -242,6 +605,7 @@ class ImageProcessor:
                                 "bbox": element.get("bbox"),
                                 "category": element_type
                             })
+                            text_categories.add(element_type)
                     
                     # Add structured content
                     if text_elements:
@@ -250,7 +614,7 @@ class ImageProcessor:
                             "content": "\n".join([elem["content"] for elem in text_elements]),
                             "metadata": {
                                 "element_count": len(text_elements),
-                                "categories": list(set([elem["category"] for elem in text_elements]))
+                                "categories": list(text_categories)
                             }
                         })
                     
@@ -361,8 +725,10 @@ class AudioProcessor:
                     }
             
             # Transcribe audio file
-            transcription_result = await transcription_service.transcribe_audio_file(
-                str(file_path)
+            transcription_result = await _call_with_retry(
+                transcription_service.transcribe_audio_file,
+                str(file_path),
+                rate_limiter=transcription_rate_limiter
             )
             
             metadata = {
@@ -398,8 +764,13 @@ class AudioProcessor:
 class DocumentProcessor:
     """Main document processing service"""
     
+    # File types whose processors can parse in-memory bytes directly;
+    # transcription still needs a real file on disk
+    IN_MEMORY_TYPES = {"pdf", "docx", "doc", "txt", "image"}
+    
     def __init__(self):
         self.text_splitter = HebrewTextSplitter()
+        self._process = None  # psutil.Process handle, created on first memory sample
         self.processors = {
             "pdf": PDFProcessor,
             "docx": DocxProcessor,
@@ -418,31 +789,13 @@ class DocumentProcessor:
     
     def _get_file_type(self, file_path: Path) -> str:
         """Determine file type from extension"""
-        extension = file_path.suffix.lower()
-        
-        type_mapping = {
-            '.pdf': 'pdf',
-            '.docx': 'docx',
-            '.doc': 'doc',
-            '.txt': 'txt',
-            '.png': 'image',
-            '.jpg': 'image',
-            '.jpeg': 'image',
-            '.tiff': 'image',
-            '.bmp': 'image',
-            '.mp3': 'audio',
-            '.wav': 'audio',
-            '.m4a': 'audio',
-            '.flac': 'audio'
-        }
-        
-        return type_mapping.get(extension, 'unknown')
+        extension = file_path.suffix
+        return _EXT_TO_TYPE.get(extension) or _EXT_TO_TYPE.get(extension.lower(), 'unknown')
     
-    async def _process_text_file(self, file_path: Path) -> Dict[str, Any]:
-        """Process plain text file"""
+    async def _process_text_file(self, file_path: Path, data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Process plain text file (or its in-memory bytes when data is given)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            content = await asyncio.to_thread(_read_text, file_path, data)
             
             return {
                 "success": True,
@@ -463,11 +816,11 @@ class DocumentProcessor:
                 "error": str(e)
             }
     
-    async def process_document(self, file_path: Union[str, Path]) -> Dict[str, Any]:
-        """Process a single document"""
+    async def process_document(self, file_path: Union[str, Path], data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Process a single document, either from disk or from its in-memory bytes"""
         file_path = Path(file_path)
         
-        if not file_path.exists():
+        if data is None and not file_path.exists():
             return {
                 "success": False,
                 "error": f"File not found: {file_path}",
@@ -476,8 +829,9 @@ class DocumentProcessor:
             }
         
         # Check file size
-        file_size_mb = file_path.stat().st_size / (1024 * 1024)
-        if file_size_mb > settings.max_file_size_mb:
+        file_size = len(data) if data is not None else file_path.stat().st_size
+        file_size_mb = file_size / (1024 * 1024)
+        if file_size > settings.max_file_size_mb * 1024 * 1024:
             return {
                 "success": False,
                 "error": f"File too large: {file_size_mb:.1f}MB (max: {settings.max_file_size_mb}MB)",
@@ -498,11 +852,32 @@ class DocumentProcessor:
         
         # Process the document
         try:
-            if file_type == 'txt':
-                extraction_result = await self._process_text_file(file_path)
+            # Hash the source bytes (not the extracted text) so different files with the
+            # same text stay distinct; identical files are only extracted (parsed/OCR'd/
+            # transcribed) once, except plain text, which is cheaper to re-read
+            file_hash = await extraction_cache.hash_source(file_path, data)
+            cache_key = None
+            extraction_result = None
+            if file_type != 'txt':
+                cache_key = extraction_cache.derived_key(file_hash, file_type)
+                extraction_result = await extraction_cache.get(cache_key)
+            
+            if extraction_result is not None:
+                logger.debug(f"Extraction cache hit for {file_path}")
+                extraction_result["metadata"]["file_path"] = str(file_path)
             else:
-                processor = self.processors[file_type]
-                extraction_result = await processor.extract_text(file_path)
+                if data is not None and file_type not in self.IN_MEMORY_TYPES:
+                    extraction_result = await self._extract_spilled(file_type, file_path, data)
+                elif file_type == 'txt':
+                    extraction_result = await self._process_text_file(file_path, data)
+                elif data is not None:
+                    extraction_result = await self.processors[file_type].extract_text(file_path, data)
+                else:
+                    processor = self.processors[file_type]
+                    extraction_result = await processor.extract_text(file_path)
+                
+                if extraction_result["success"] and extraction_result.get("cacheable", True):
+                    await extraction_cache.put(cache_key, extraction_result)
             
             if not extraction_result["success"]:
                 return {
@@ -512,8 +887,11 @@ class DocumentProcessor:
                     "metadata": extraction_result["metadata"]
                 }
             
-            # Combine all extracted text with layout awareness
-            full_text = ""
+            # Combine all extracted text with layout awareness, hashing each piece
+            # as it is produced instead of re-encoding the whole document afterwards
+            text_parts = []
+            element_parts = []
+            hasher = hashlib.blake2b(digest_size=16)
             layout_metadata = {}
             
             for content_item in extraction_result["content"]:
@@ -522,27 +900,41 @@ class DocumentProcessor:
                     content = content_item.get("content", "")
                     
                     # Add type-specific formatting
+                    element_kind = "text"
                     if content_type == "table":
-                        full_text += f"\n[טבלה]\n{content}\n[/טבלה]\n\n"
+                        part = f"\n[טבלה]\n{content}\n[/טבלה]\n\n"
                         layout_metadata["has_tables"] = True
+                        element_kind = "table"
                     elif content_type == "formula":
-                        full_text += f"\n[נוסחה]\n{content}\n[/נוסחה]\n\n"
+                        part = f"\n[נוסחה]\n{content}\n[/נוסחה]\n\n"
                         layout_metadata["has_formulas"] = True
+                        element_kind = "formula"
                     elif content_type == "text_block":
-                        full_text += f"{content}\n\n"
+                        part = f"{content}\n\n"
                         layout_metadata["has_text_blocks"] = True
                     else:
-                        full_text += f"{content}\n\n"
+                        part = f"{content}\n\n"
                 else:
-                    full_text += str(content_item) + "\n\n"
+                    part = str(content_item) + "\n\n"
+                    element_kind = "text"
+                
+                text_parts.append(part)
+                element_parts.append((element_kind, part))
+                hasher.update(part.encode())
+            
+            full_text = "".join(text_parts)
             
             # Add document hash for deduplication
-            doc_hash = hashlib.md5(full_text.encode()).hexdigest()
+            doc_hash = hasher.hexdigest()
             
-            # Create base metadata with layout information
+            # Create base metadata with layout information; the raw OCR layout stays in the
+            # extraction result only, since it repeats the document's full text and would
+            # otherwise be copied into every chunk's metadata
             base_metadata = extraction_result["metadata"].copy()
+            base_metadata.pop("layout_data", None)
             base_metadata.update({
                 "document_hash": doc_hash,
+                "file_hash": file_hash,
                 "file_size_mb": file_size_mb,
                 "total_chars": len(full_text),
                 "layout_aware": True
@@ -562,8 +954,8 @@ class DocumentProcessor:
                     "formula_elements": extraction_result["metadata"].get("formula_elements", 0)
                 })
             
-            # Split text into chunks
-            chunks = self.text_splitter.split_text(full_text, base_metadata)
+            # Split text into chunks, keeping tables and formulas whole
+            chunks = self.text_splitter.split_parts(element_parts, base_metadata)
             
             return {
                 "success": True,
@@ -581,8 +973,63 @@ class DocumentProcessor:
                 "metadata": {"file_path": str(file_path)}
             }
     
-    async def process_multiple_documents(self, file_paths: List[Union[str, Path]]) -> Dict[str, Any]:
-        """Process multiple documents concurrently with memory management"""
+    @staticmethod
+    def _remove_temp_file(temp_path: str):
+        """Delete a spilled temp file, logging if it can't be removed"""
+        try:
+            os.remove(temp_path)
+        except OSError as e:
+            logger.warning(f"Failed to remove temporary file {temp_path}: {e}")
+    
+    @staticmethod
+    def _write_fd(fd: int, data: bytes):
+        """Write bytes to an open file descriptor and close it"""
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+    
+    async def _extract_spilled(self, file_type: str, file_path: Path, data: bytes) -> Dict[str, Any]:
+        """Write in-memory bytes to a temporary file for processors that need a path"""
+        fd, temp_path = tempfile.mkstemp(dir=settings.upload_dir, suffix=file_path.suffix.lower())
+        try:
+            # Write off the event loop so spills for a concurrently processed batch overlap
+            await asyncio.to_thread(self._write_fd, fd, data)
+            return await self.processors[file_type].extract_text(Path(temp_path))
+        finally:
+            await asyncio.to_thread(self._remove_temp_file, temp_path)
+    
+    @staticmethod
+    def _copy_stream_to_fd(stream: BinaryIO, fd: int):
+        """Copy a binary stream into an open file descriptor in 1MB chunks and close it"""
+        stream.seek(0)
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(stream, f, 1 << 20)
+    
+    async def process_stream(self, filename: str, stream: BinaryIO) -> Dict[str, Any]:
+        """Process a document from an open binary stream (e.g. an upload's spooled file)"""
+        file_path = Path(filename)
+        file_type = self._get_file_type(file_path)
+        
+        if file_type in self.IN_MEMORY_TYPES or file_type not in self.processors:
+            stream.seek(0)
+            data = await asyncio.to_thread(stream.read)
+            return await self.process_document(file_path, data=data)
+        
+        # Transcription needs a path: copy the stream to disk without buffering it all
+        fd, temp_path = tempfile.mkstemp(dir=settings.upload_dir, suffix=file_path.suffix.lower())
+        try:
+            await asyncio.to_thread(self._copy_stream_to_fd, stream, fd)
+            return await self.process_document(temp_path)
+        finally:
+            await asyncio.to_thread(self._remove_temp_file, temp_path)
+    
+    async def _process_source(self, source: Union[str, Path, Tuple[str, BinaryIO]]) -> Dict[str, Any]:
+        """Process either a file path or a (filename, stream) pair"""
+        if isinstance(source, tuple):
+            return await self.process_stream(*source)
+        return await self.process_document(source)
+    
+    async def process_multiple_documents(self, file_paths: List[Union[str, Path, Tuple[str, BinaryIO]]]) -> Dict[str, Any]:
+        """Process multiple documents (paths or (filename, stream) pairs) concurrently with memory management"""
         results = {
             "successful": [],
             "failed": [],
@@ -591,49 +1038,54 @@ class DocumentProcessor:
             "memory_usage": {}
         }
         
-        # Process documents in batches to manage memory
-        batch_size = 5  # Process 5 documents at a time
+        # Bound concurrency with a semaphore so a new document starts as soon as
+        # any slot frees up, instead of waiting for the slowest file of a batch
+        max_concurrent = settings.max_concurrent_docs
+        semaphore = asyncio.Semaphore(max_concurrent)
         total_files = len(file_paths)
         
-        logger.info(f"Processing {total_files} documents in batches of {batch_size}")
+        logger.info(f"Processing {total_files} documents, up to {max_concurrent} at a time")
         
-        for i in range(0, total_files, batch_size):
-            batch_files = file_paths[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (total_files + batch_size - 1) // batch_size
-            
-            logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch_files)} files)")
-            
-            # Process current batch
-            tasks = [self.process_document(path) for path in batch_files]
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Process batch results
-            for file_path, result in zip(batch_files, batch_results):
-                if isinstance(result, Exception):
-                    results["failed"].append({
-                        "file_path": str(file_path),
-                        "error": str(result)
-                    })
-                elif result["success"]:
-                    results["successful"].append({
-                        "file_path": str(file_path),
-                        "documents": result["documents"],
-                        "metadata": result["metadata"]
-                    })
-                    results["total_chunks"] += len(result["documents"])
-                else:
-                    results["failed"].append({
-                        "file_path": str(file_path),
-                        "error": result["error"]
-                    })
+        async def run(source):
+            async with semaphore:
+                try:
+                    return source, await self._process_source(source)
+                except Exception as e:
+                    return source, e
+        
+        completed = 0
+        for next_result in asyncio.as_completed([run(source) for source in file_paths]):
+            source, result = await next_result
+            completed += 1
             
-            # Memory cleanup after each batch
-            await self._cleanup_batch_memory()
+            file_path = source[0] if isinstance(source, tuple) else source
+            if isinstance(result, Exception):
+                results["failed"].append({
+                    "file_path": str(file_path),
+                    "error": str(result)
+                })
+            elif result["success"]:
+                results["successful"].append({
+                    "file_path": str(file_path),
+                    "documents": result["documents"],
+                    "metadata": result["metadata"]
+                })
+                results["total_chunks"] += len(result["documents"])
+            else:
+                results["failed"].append({
+                    "file_path": str(file_path),
+                    "error": result["error"]
+                })
             
-            # Log progress
-            processed_so_far = len(results["successful"]) + len(results["failed"])
-            logger.info(f"Progress: {processed_so_far}/{total_files} documents processed")
+            # Memory cleanup every max_concurrent documents (and after the last one)
+            if completed % max_concurrent == 0 or completed == total_files:
+                await self._cleanup_batch_memory()
+                logger.info(f"Progress: {completed}/{total_files} documents processed")
+                if logger.isEnabledFor(logging.DEBUG):
+                    try:
+                        logger.debug(f"Process RSS: {self._process_rss_mb():.0f} MB")
+                    except Exception as e:
+                        logger.debug(f"Could not sample process memory: {e}")
         
         results["total_documents"] = len(results["successful"])
         
@@ -658,6 +1110,13 @@ class DocumentProcessor:
         except Exception as e:
             logger.warning(f"Error during batch memory cleanup: {e}")
     
+    def _process_rss_mb(self) -> float:
+        """Resident memory of this process, via a cached psutil handle"""
+        if self._process is None:
+            import psutil
+            self._process = psutil.Process()
+        return self._process.memory_info().rss / 1024**2
+    
     async def _get_memory_usage(self) -> Dict[str, Any]:
         """Get current memory usage information"""
         try:
@@ -667,13 +1126,15 @@ class DocumentProcessor:
             if hasattr(ocr_service, 'dots_ocr') and ocr_service.dots_ocr.is_available():
                 memory_info["ocr_service"] = ocr_service.dots_ocr.get_memory_usage()
             
-            # Get system memory usage
+            # Get system memory usage (one snapshot; numbers stay numeric for aggregation)
             import psutil
+            memory = psutil.virtual_memory()
             memory_info["system"] = {
-                "memory_percent": psutil.virtual_memory().percent,
-                "memory_available": f"{psutil.virtual_memory().available / 1024**3:.2f} GB",
-                "memory_total": f"{psutil.virtual_memory().total / 1024**3:.2f} GB"
+                "memory_percent": memory.percent,
+                "memory_available_gb": memory.available / 1024**3,
+                "memory_total_gb": memory.total / 1024**3
             }
+            memory_info["process_rss_mb"] = self._process_rss_mb()
             
             return memory_info
             
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import orjson
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes so stale entries are ignored
+EXTRACTION_CACHE_VERSION = 3
+HASH_CHUNK_SIZE = 1 << 20
+
+class ExtractionCache:
+    """Disk-backed cache of extraction results keyed by file content hash"""
+
+    def __init__(self):
+        self.enabled = settings.extraction_cache_enabled
+        self.cache_dir = Path(settings.extraction_cache_dir)
+        self.max_entries = settings.extraction_cache_max_entries
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        with open(file_path, 'rb') as f:
+            try:
+                # Hash the memory-mapped file in one call: no copies, and hashlib drops the GIL
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return hashlib.blake2b(mapped, digest_size=20).hexdigest()
+            except (ValueError, OSError):
+                # Empty files and special files can't be mapped
+                hasher = hashlib.blake2b(digest_size=20)
+                while chunk := f.read(HASH_CHUNK_SIZE):
+                    hasher.update(chunk)
+                return hasher.hexdigest()
+
+    async def hash_source(self, file_path: Path, data: Optional[bytes] = None) -> str:
+        """Content hash of a source document (in-memory bytes or a file on disk)"""
+        if data is not None:
+            return await asyncio.to_thread(lambda: hashlib.blake2b(data, digest_size=20).hexdigest())
+        return await asyncio.to_thread(self._hash_file, file_path)
+
+    def derived_key(self, digest: str, kind: str) -> Optional[str]:
+        """Cache key for content the caller has already hashed (a source file or a PDF page segment)"""
+        if not self.enabled:
+            return None
+        return f"{digest}_{kind}_v{EXTRACTION_CACHE_VERSION}"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache_dir / f"{key}.json"
+        try:
+            result = orjson.loads(entry.read_bytes())
+        except FileNotFoundError:
+            return None
+        # Touch the entry so eviction drops the least recently used ones
+        os.utime(entry)
+        return result
+
+    def _write(self, key: str, result: Dict[str, Any]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps(result))
+            os.replace(temp_path, self.cache_dir / f"{key}.json")
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    async def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a cached extraction result, or None on a miss"""
+        if key is None:
+            return None
+        try:
+            return await asyncio.to_thread(self._read, key)
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed: {e}")
+            return None
+
+    async def put(self, key: Optional[str], result: Dict[str, Any]):
+        """Store a successful extraction result"""
+        if key is None:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, result)
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed: {e}")
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
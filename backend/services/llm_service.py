@@ -1,39 +1,69 @@
+import asyncio
 import logging
-from typing import Optional, Dict, Any, AsyncGenerator
+import time
+from typing import Optional, Dict, Any, AsyncGenerator, Tuple
 import httpx
-import json
+import orjson
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# (ollama_host, model) -> monotonic time the model was last confirmed available
+_MODEL_READY: Dict[Tuple[str, str], float] = {}
+MODEL_READY_TTL = 300.0
+
+# Payloads are encoded with orjson, which writes UTF-8 directly instead of escaping Hebrew
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 class OllamaLLMService:
     """Service for interacting with Ollama-hosted LLMs"""
     
     def __init__(self):
         self.base_url = settings.ollama_host
         self.model_name = settings.llm_model
-        self.client = httpx.AsyncClient(timeout=300.0)  # 5 minute timeout
+        # HTTP/2 multiplexes concurrent generations over one connection; httpx only
+        # negotiates it over TLS, so a plain-http Ollama keeps pooled HTTP/1.1 connections
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(300.0, connect=5.0),  # 5 minute timeout, fail fast if Ollama is down
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        # Ollama decodes up to OLLAMA_NUM_PARALLEL requests together; keep at most that
+        # many in flight so the rest wait here instead of timing out in Ollama's queue
+        self._generation_slots = asyncio.Semaphore(settings.ollama_num_parallel)
         
     async def initialize(self):
         """Initialize the LLM service and pull the model if needed"""
         try:
             logger.info(f"Initializing LLM service with model: {self.model_name}")
             
-            # Check if Ollama is running
-            response = await self.client.get(f"{self.base_url}/api/tags")
-            if response.status_code != 200:
-                raise RuntimeError(f"Ollama not accessible at {self.base_url}")
+            key = (self.base_url, self.model_name)
+            if time.monotonic() - _MODEL_READY.get(key, float("-inf")) < MODEL_READY_TTL:
+                logger.info(f"Model {self.model_name} was recently confirmed available")
+                return
             
-            # Check if our model is available
-            models = response.json().get("models", [])
-            model_names = [model.get("name", "") for model in models]
+            # Ask about our model directly instead of listing every installed model
+            response = await self.client.post(
+                f"{self.base_url}/api/show",
+                json={"model": self.model_name}
+            )
             
-            if self.model_name not in model_names:
+            if response.status_code == 404:
                 logger.info(f"Model {self.model_name} not found locally, pulling...")
                 await self._pull_model()
+            elif response.status_code != 200:
+                raise RuntimeError(f"Ollama not accessible at {self.base_url}")
             else:
                 logger.info(f"Model {self.model_name} is already available")
+            
+            _MODEL_READY[key] = time.monotonic()
                 
         except Exception as e:
             logger.error(f"Failed to initialize LLM service: {e}")
@@ -80,13 +110,16 @@ class OllamaLLMService:
             if max_tokens:
                 payload["options"]["num_predict"] = max_tokens
             
-            response = await self.client.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
+            async with self._generation_slots:
+                response = await self.client.post(
+                    f"{self.base_url}/api/generate",
+                    content=orjson.dumps(payload),
+                    headers=_JSON_HEADERS
+                )
             
             if response.status_code == 200:
-                result = response.json()
+                # Parse the raw body bytes directly instead of decoding it to str first
+                result = orjson.loads(response.content)
                 return result.get("response", "")
             else:
                 raise RuntimeError(f"LLM generation failed: {response.text}")
@@ -119,24 +152,35 @@ class OllamaLLMService:
             if max_tokens:
                 payload["options"]["num_predict"] = max_tokens
             
-            async with self.client.stream(
+            async with self._generation_slots, self.client.stream(
                 "POST",
                 f"{self.base_url}/api/generate",
-                json=payload
+                content=orjson.dumps(payload),
+                headers=_JSON_HEADERS
             ) as response:
                 if response.status_code != 200:
                     raise RuntimeError(f"LLM streaming failed: {await response.aread()}")
                 
-                async for line in response.aiter_lines():
-                    if line.strip():
+                # Split the NDJSON stream on raw bytes and parse with orjson, skipping
+                # httpx's line decoding to str
+                buffer = bytearray()
+                done = False
+                async for chunk in response.aiter_bytes():
+                    buffer += chunk
+                    while not done and (newline := buffer.find(b"\n")) != -1:
+                        line = bytes(buffer[:newline])
+                        del buffer[:newline + 1]
+                        if not line.strip():
+                            continue
                         try:
-                            data = json.loads(line)
-                            if "response" in data:
-                                yield data["response"]
-                            if data.get("done", False):
-                                break
-                        except json.JSONDecodeError:
+                            data = orjson.loads(line)
+                        except orjson.JSONDecodeError:
                             continue
+                        if "response" in data:
+                            yield data["response"]
+                        done = data.get("done", False)
+                    if done:
+                        break
                             
         except Exception as e:
             logger.error(f"Failed to generate streaming response: {e}")
@@ -146,22 +190,41 @@ class OllamaLLMService:
         """Close the HTTP client"""
         await self.client.aclose()
 
+# Hebrew prompt templates, built once
+HEBREW_SYSTEM_PROMPT = """
+אתה עוזר AI מתקדם המתמחה בעיבוד טקסטים בעברית.
+אתה עונה בעברית בצורה ברורה ומדויקת.
+כאשר אתה מקבל מידע מבסיס הנתונים, אתה משתמש בו כדי לענות על השאלות בצורה מקיפה ומדויקת.
+אם אין לך מספיק מידע לענות על השאלה, אמור זאת בבירור.
+""".strip()
+_PROMPT_WITH_CONTEXT = "בהתבסס על המידע הבא:\n{context}\n\nשאלה: {query}\n\nתשובה:"
+_PROMPT_WITHOUT_CONTEXT = "שאלה: {query}\n\nתשובה:"
+
 class HebrewLLMService:
     """Enhanced LLM service with Hebrew-specific optimizations"""
     
     def __init__(self):
         self.ollama_service = OllamaLLMService()
-        self.hebrew_system_prompt = """
-אתה עוזר AI מתקדם המתמחה בעיבוד טקסטים בעברית.
-אתה עונה בעברית בצורה ברורה ומדויקת.
-כאשר אתה מקבל מידע מבסיס הנתונים, אתה משתמש בו כדי לענות על השאלות בצורה מקיפה ומדויקת.
-אם אין לך מספיק מידע לענות על השאלה, אמור זאת בבירור.
-"""
+        self.hebrew_system_prompt = HEBREW_SYSTEM_PROMPT
+        self.initialized = False
+        # Concurrent callers must not trigger duplicate model checks/pulls
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
         """Initialize the Hebrew LLM service"""
-        await self.ollama_service.initialize()
-        logger.info("Hebrew LLM service initialized")
+        async with self._init_lock:
+            if self.initialized:
+                return
+            await self.ollama_service.initialize()
+            self.initialized = True
+            logger.info("Hebrew LLM service initialized")
+    
+    @staticmethod
+    def _build_prompt(query: str, context: Optional[str] = None) -> str:
+        """Construct the prompt, with the retrieved context when there is one"""
+        if context:
+            return _PROMPT_WITH_CONTEXT.format(context=context, query=query)
+        return _PROMPT_WITHOUT_CONTEXT.format(query=query)
     
     async def generate_hebrew_response(
         self,
@@ -171,17 +234,7 @@ class HebrewLLMService:
     ) -> str:
         """Generate a Hebrew response with optional context"""
         
-        # Construct the prompt with context
-        if context:
-            prompt = f"""
-בהתבסס על המידע הבא:
-{context}
-
-שאלה: {query}
-
-תשובה:"""
-        else:
-            prompt = f"שאלה: {query}\n\nתשובה:"
+        prompt = self._build_prompt(query, context)
         
         return await self.ollama_service.generate_response(
             prompt=prompt,
@@ -197,17 +250,7 @@ class HebrewLLMService:
     ) -> AsyncGenerator[str, None]:
         """Generate a streaming Hebrew response with optional context"""
         
-        # Construct the prompt with context
-        if context:
-            prompt = f"""
-בהתבסס על המידע הבא:
-{context}
-
-שאלה: {query}
-
-תשובה:"""
-        else:
-            prompt = f"שאלה: {query}\n\nתשובה:"
+        prompt = self._build_prompt(query, context)
         
         async for token in self.ollama_service.generate_response_stream(
             prompt=prompt,
@@ -1,7 +1,11 @@
-import os
+import io
+import importlib.util
+import platform
 import asyncio
-import json
-from typing import Optional, Dict, Any, Union, List
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Union, List, Tuple, Callable, Awaitable, AsyncGenerator
 from pathlib import Path
 import logging
 
@@ -14,7 +18,7 @@ except ImportError:
 
 try:
     import torch
-    from transformers import AutoModelForCausalLM, AutoProcessor
+    from transformers import AutoModelForCausalLM, AutoProcessor, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
     from qwen_vl_utils import process_vision_info
     DOTS_OCR_AVAILABLE = True
 except ImportError:
@@ -24,6 +28,107 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Queried once: the checks hit the CUDA driver / platform module on every call
+_CUDA_AVAILABLE = DOTS_OCR_AVAILABLE and torch.cuda.is_available()
+_IS_MACOS = platform.system() == "Darwin"
+
+# An image file path, encoded image bytes, or an already decoded PIL image
+ImageInput = Union[str, Path, bytes, Any]
+
+def _image_source(image: ImageInput) -> Any:
+    """Path string or PIL image, as accepted by process_vision_info and pytesseract"""
+    if isinstance(image, (str, Path)):
+        return str(image)
+    if isinstance(image, bytes):
+        from PIL import Image
+        return Image.open(io.BytesIO(image))
+    return image
+
+def _render_pdf_page(doc, page_num: int, dpi: int) -> Any:
+    """Rasterize one PDF page to an in-memory PIL image (blocking)"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+    
+    # Dots.ocr works best with DPI 200-300; wrap the raw RGB samples (no PNG encode/
+    # decode, and frombuffer shares the samples copy instead of copying it again)
+    pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+    return Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", pix.stride, 1)
+
+if DOTS_OCR_AVAILABLE:
+    class _StopOnEvent(StoppingCriteria):
+        """Stops generate() at the next decode step once the event is set"""
+        
+        def __init__(self, event: threading.Event):
+            self.event = event
+        
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+class OCRBatchQueue:
+    """Coalesces concurrent OCR requests into batches for a single model call
+    
+    run_batch returns one outcome per request, in order: a result, or the exception
+    that request failed with.
+    """
+    
+    def __init__(
+        self,
+        run_batch: Callable[[List[Tuple[ImageInput, str]]], Awaitable[List[Union[Dict[str, Any], Exception]]]],
+        max_batch_size: int,
+        max_wait_time: float
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    async def submit(self, image_path: ImageInput, task_type: str) -> Dict[str, Any]:
+        """Queue one image and wait for its result"""
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._process_loop())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image_path, task_type, future))
+        return await future
+    
+    async def _collect_batch(self) -> List[Tuple[ImageInput, str, asyncio.Future]]:
+        """Wait for one request, then gather more until the batch is full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait_time
+        
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _process_loop(self):
+        while True:
+            batch = await self._collect_batch()
+            if len(batch) > 1:
+                logger.debug(f"Running batched OCR for {len(batch)} images")
+            
+            try:
+                outcomes = await self.run_batch([(image_path, task_type) for image_path, task_type, _ in batch])
+                for (_, _, future), outcome in zip(batch, outcomes):
+                    if future.done():
+                        continue
+                    if isinstance(outcome, Exception):
+                        future.set_exception(outcome)
+                    else:
+                        future.set_result(outcome)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
 class DotsOCRService:
     """Service for document OCR using dots.ocr model"""
     
@@ -31,7 +136,17 @@ class DotsOCRService:
         self.model_name = settings.dots_ocr_model
         self.model = None
         self.processor = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = "cuda" if _CUDA_AVAILABLE else "cpu"
+        self._chat_texts: Dict[str, str] = {}  # task_type -> chat-templated prompt
+        # Batched and streaming generate() share the model (and its static KV cache when
+        # compiled), so only one of them runs at a time
+        self._generate_lock = threading.Lock()
+        # Model calls run in a worker thread so requests keep queuing up during inference
+        self.batch_queue = OCRBatchQueue(
+            lambda requests: asyncio.to_thread(self._generate_batch, requests),
+            max_batch_size=settings.ocr_batch_size,
+            max_wait_time=settings.ocr_batch_wait_ms / 1000
+        )
         
     def is_available(self) -> bool:
         """Check if dots.ocr dependencies are available and compatible"""
@@ -39,8 +154,7 @@ class DotsOCRService:
             return False
         
         # Check if we're on Mac (flash_attn doesn't work on Mac)
-        import platform
-        if platform.system() == "Darwin":
+        if _IS_MACOS:
             logger.info("Running on macOS - dots.ocr not available (flash_attn not supported)")
             return False
         
@@ -61,7 +175,7 @@ class DotsOCRService:
             # Check available memory if using CUDA
             if self.device == "cuda":
                 try:
-                    if torch.cuda.is_available():
+                    if _CUDA_AVAILABLE:
                         gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
                         logger.info(f"GPU memory available: {gpu_memory:.1f} GB")
                         if gpu_memory < 8:
@@ -69,32 +183,77 @@ class DotsOCRService:
                 except Exception as e:
                     logger.warning(f"Could not check GPU memory: {e}")
             
+            # Use FlashAttention when installed, otherwise PyTorch's fused SDPA kernels
+            attn_implementation = (
+                "flash_attention_2" if importlib.util.find_spec("flash_attn") is not None else "sdpa"
+            )
+            
             # Try to load the model
             try:
                 self.model = AutoModelForCausalLM.from_pretrained(
                     self.model_name,
                     torch_dtype=torch.bfloat16,
                     device_map="auto",
-                    trust_remote_code=True
+                    trust_remote_code=True,
+                    attn_implementation=attn_implementation,
+                    **self._quantization_kwargs()
                 )
-                logger.info("Model loaded successfully")
+                logger.info(f"Model loaded successfully (attention: {attn_implementation})")
                 
             except Exception as e:
                 logger.error(f"Failed to load dots.ocr model: {e}")
-                logger.warning("Dots.OCR model requires flash_attn. Consider installing it or using Tesseract fallback.")
-                raise RuntimeError(f"Dots.OCR model requires flash_attn: {e}")
+                logger.warning("Consider installing flash_attn or using Tesseract fallback.")
+                raise RuntimeError(f"Failed to load dots.ocr model: {e}")
+            
+            if settings.dots_ocr_compile and self.device == "cuda":
+                # Compiles per input shape on first use, so the first batches are slower
+                self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", dynamic=True)
+                logger.info("dots.ocr forward pass compiled with torch.compile")
             
             # Load the processor
             self.processor = AutoProcessor.from_pretrained(
                 self.model_name, 
                 trust_remote_code=True
             )
+            # Batched generation needs prompts aligned on the right
+            if hasattr(self.processor, "tokenizer"):
+                self.processor.tokenizer.padding_side = "left"
             
             logger.info("Dots OCR model initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize dots.ocr model: {e}")
             raise
     
+    def _quantization_kwargs(self) -> Dict[str, Any]:
+        """from_pretrained() arguments for the configured weight quantization, if any"""
+        quantization = settings.dots_ocr_quantization
+        if quantization == "none":
+            return {}
+        
+        if self.device != "cuda":
+            logger.warning(f"dots.ocr {quantization} quantization needs CUDA, loading in bfloat16")
+            return {}
+        
+        try:
+            from transformers import BitsAndBytesConfig
+            import bitsandbytes  # noqa: F401
+        except ImportError:
+            logger.warning(f"bitsandbytes not installed, loading dots.ocr in bfloat16 instead of {quantization}")
+            return {}
+        
+        # Weight-only quantization: decode is bound by reading the weights, compute stays in bfloat16
+        if quantization == "4bit":
+            config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_compute_dtype=torch.bfloat16,
+                bnb_4bit_quant_type="nf4"
+            )
+        else:
+            config = BitsAndBytesConfig(load_in_8bit=True)
+        
+        logger.info(f"Loading dots.ocr with {quantization} weights")
+        return {"quantization_config": config}
+    
     def _create_prompt(self, task_type: str = "full") -> str:
         """Create appropriate prompt based on task type"""
         if task_type == "layout_only":
@@ -129,9 +288,151 @@ class DotsOCRService:
    - All layout elements must be sorted according to human reading order.
 5. Final Output: The entire output must be a single JSON object."""
     
+    def _build_messages(self, image_path: ImageInput, task_type: str) -> List[Dict[str, Any]]:
+        """Chat messages for one image and task prompt"""
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image", "image": _image_source(image_path)},
+                    {"type": "text", "text": self._create_prompt(task_type)}
+                ]
+            }
+        ]
+    
+    @staticmethod
+    def _parse_output(output_text: str, task_type: str) -> Dict[str, Any]:
+        """Wrap generated text, parsing JSON for structured task types"""
+        # Parse JSON if it's a structured output
+        try:
+            if task_type == "full" or task_type == "layout_only":
+                parsed_output = orjson.loads(output_text)
+                return {
+                    "text": output_text,
+                    "parsed": parsed_output,
+                    "task_type": task_type,
+                    "success": True
+                }
+            else:
+                return {
+                    "text": output_text,
+                    "parsed": None,
+                    "task_type": task_type,
+                    "success": True
+                }
+        except orjson.JSONDecodeError:
+            # If JSON parsing fails, return raw text
+            return {
+                "text": output_text,
+                "parsed": None,
+                "task_type": task_type,
+                "success": True
+            }
+    
+    def _chat_text(self, task_type: str) -> str:
+        """Chat-templated prompt for a task type
+        
+        The template only contains a placeholder for the image (expanded to image
+        tokens by the processor), so it is rendered once per task type.
+        """
+        text = self._chat_texts.get(task_type)
+        if text is None:
+            text = self.processor.apply_chat_template(
+                self._build_messages("", task_type), tokenize=False, add_generation_prompt=True
+            )
+            self._chat_texts[task_type] = text
+        return text
+    
+    def _generate_batch(self, requests: List[Tuple[ImageInput, str]]) -> List[Union[Dict[str, Any], Exception]]:
+        """Run batched generate() over several (image_path, task_type) requests (blocking)
+        
+        Returns one result or exception per request. A batch that runs out of GPU memory
+        is split in half and retried, and later batches are capped at the size that fit;
+        a batch failing for any other reason is retried one request at a time, so a bad
+        image only fails its own request.
+        """
+        try:
+            return self._generate(requests)
+        except torch.cuda.OutOfMemoryError as e:
+            if len(requests) == 1:
+                return [e]
+            torch.cuda.empty_cache()
+            half = len(requests) // 2
+            self.batch_queue.max_batch_size = min(self.batch_queue.max_batch_size, half)
+            logger.warning(f"OCR batch of {len(requests)} ran out of GPU memory, retrying in batches of {half}")
+            return self._generate_batch(requests[:half]) + self._generate_batch(requests[half:])
+        except Exception as e:
+            if len(requests) == 1:
+                return [e]
+            logger.warning(f"OCR batch of {len(requests)} failed ({e}), retrying requests one at a time")
+            return [outcome for request in requests for outcome in self._generate_batch([request])]
+    
+    @staticmethod
+    def _generation_kwargs() -> Dict[str, Any]:
+        """generate() arguments shared by the batched and streaming paths"""
+        kwargs = {"max_new_tokens": 24000, "do_sample": False, "use_cache": True}
+        if settings.dots_ocr_compile:
+            # A preallocated KV cache keeps shapes fixed across decode steps, so the
+            # compiled forward pass doesn't recompile as the sequence grows
+            kwargs["cache_implementation"] = "static"
+        return kwargs
+    
+    def _prepare_inputs(self, requests: List[Tuple[ImageInput, str]]):
+        """Processor inputs for (image_path, task_type) requests, on the model's device (blocking)"""
+        messages = [self._build_messages(image_path, task_type) for image_path, task_type in requests]
+        
+        # Prepare inputs for inference
+        texts = [self._chat_text(task_type) for _, task_type in requests]
+        
+        image_inputs, video_inputs = process_vision_info(messages)
+        inputs = self.processor(
+            text=texts,
+            images=image_inputs,
+            videos=video_inputs,
+            padding=True,
+            return_tensors="pt"
+        )
+        
+        # Move inputs to device; from pinned host memory the copy is asynchronous, so it
+        # overlaps with whatever the GPU is still running
+        if self.device == "cuda":
+            for key, value in inputs.items():
+                if torch.is_tensor(value):
+                    inputs[key] = value.pin_memory().to(self.device, non_blocking=True)
+            return inputs
+        return inputs.to(self.device)
+    
+    def _generate(self, requests: List[Tuple[ImageInput, str]]) -> List[Dict[str, Any]]:
+        """Run a single batched generate() over several (image_path, task_type) requests (blocking)"""
+        inputs = self._prepare_inputs(requests)
+        
+        # Generate output
+        with self._generate_lock, torch.no_grad():
+            generated_ids = self.model.generate(
+                **inputs, 
+                **self._generation_kwargs()
+            )
+        
+        # Decode the generated text
+        generated_ids_trimmed = [
+            out_ids[len(in_ids):] 
+            for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
+        ]
+        
+        output_texts = self.processor.batch_decode(
+            generated_ids_trimmed,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=False
+        )
+        
+        return [
+            self._parse_output(output_text, task_type)
+            for output_text, (_, task_type) in zip(output_texts, requests)
+        ]
+    
     async def extract_text_from_image(
         self, 
-        image_path: Union[str, Path], 
+        image_path: ImageInput, 
         task_type: str = "full"
     ) -> Dict[str, Any]:
         """Extract text from image using dots.ocr"""
@@ -141,89 +442,73 @@ class DotsOCRService:
         try:
             logger.info(f"Processing image with dots.ocr: {image_path}")
             
-            # Create prompt based on task type
-            prompt = self._create_prompt(task_type)
-            
-            # Prepare messages for the model
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image", "image": str(image_path)},
-                        {"type": "text", "text": prompt}
-                    ]
-                }
-            ]
-            
-            # Prepare inputs for inference
-            text = self.processor.apply_chat_template(
-                messages, 
-                tokenize=False, 
-                add_generation_prompt=True
-            )
-            
-            image_inputs, video_inputs = process_vision_info(messages)
-            inputs = self.processor(
-                text=[text],
-                images=image_inputs,
-                videos=video_inputs,
-                padding=True,
-                return_tensors="pt"
-            )
-            
-            # Move inputs to device
-            inputs = inputs.to(self.device)
-            
-            # Generate output
-            with torch.no_grad():
-                generated_ids = self.model.generate(
-                    **inputs, 
-                    max_new_tokens=24000,
-                    do_sample=False
-                )
-            
-            # Decode the generated text
-            generated_ids_trimmed = [
-                out_ids[len(in_ids):] 
-                for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-            ]
-            
-            output_text = self.processor.batch_decode(
-                generated_ids_trimmed,
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=False
-            )[0]
-            
-            # Parse JSON if it's a structured output
-            try:
-                if task_type == "full" or task_type == "layout_only":
-                    parsed_output = json.loads(output_text)
-                    return {
-                        "text": output_text,
-                        "parsed": parsed_output,
-                        "task_type": task_type,
-                        "success": True
-                    }
-                else:
-                    return {
-                        "text": output_text,
-                        "parsed": None,
-                        "task_type": task_type,
-                        "success": True
-                    }
-            except json.JSONDecodeError:
-                # If JSON parsing fails, return raw text
-                return {
-                    "text": output_text,
-                    "parsed": None,
-                    "task_type": task_type,
-                    "success": True
-                }
+            # Concurrent requests are coalesced into batched generate() calls
+            return await self.batch_queue.submit(image_path, task_type)
                 
         except Exception as e:
             logger.error(f"Dots OCR failed for {image_path}: {e}")
             raise
     
+    def _generate_streaming(self, inputs, streamer, stop: threading.Event):
+        """Run generate() feeding a streamer until done or stopped (blocking); always ends the stream"""
+        try:
+            with self._generate_lock:
+                if stop.is_set():
+                    # The consumer went away while waiting for the model
+                    streamer.end()
+                    return
+                with torch.no_grad():
+                    self.model.generate(
+                        **inputs,
+                        **self._generation_kwargs(),
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop)])
+                    )
+        except Exception:
+            streamer.end()
+            raise
+    
+    async def extract_text_from_image_stream(
+        self,
+        image_path: ImageInput,
+        task_type: str = "full"
+    ) -> AsyncGenerator[str, None]:
+        """Stream dots.ocr output text for one image as it is generated
+        
+        Not batched: generation waits for the model to be free of batched requests.
+        Closing the generator early stops generation at the next token.
+        """
+        if not self.model or not self.processor:
+            raise RuntimeError("Dots.OCR model not initialized")
+        
+        inputs = await asyncio.to_thread(self._prepare_inputs, [(image_path, task_type)])
+        streamer = TextIteratorStreamer(
+            self.processor.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=False
+        )
+        stop = threading.Event()
+        generation = asyncio.ensure_future(asyncio.to_thread(self._generate_streaming, inputs, streamer, stop))
+        
+        finished = False
+        try:
+            # The streamer is a blocking iterator, so each read waits in a worker thread
+            while (text := await asyncio.to_thread(next, streamer, None)) is not None:
+                if text:
+                    yield text
+            finished = True
+        finally:
+            # A no-op once the stream ended; otherwise frees the GPU for the next request
+            stop.set()
+            try:
+                await generation
+            except Exception as e:
+                # Surface generation errors, unless the consumer already stopped reading
+                if finished:
+                    raise
+                logger.debug(f"Streaming OCR generation ended with an error after the consumer stopped: {e}")
+    
     async def extract_text_from_pdf(
         self, 
         pdf_path: Union[str, Path], 
@@ -245,69 +530,63 @@ class DotsOCRService:
                 raise RuntimeError("PyMuPDF (fitz) is required for PDF processing. Install with: pip install PyMuPDF")
             
             doc = fitz.open(str(pdf_path))
-            all_results = []
             total_pages = len(doc)
             
             logger.info(f"Processing {total_pages} pages with DPI {dpi}")
             
-            # Process pages with progress tracking
-            for page_num in range(total_pages):
-                try:
-                    page = doc.load_page(page_num)
-                    
-                    # Convert page to image with optimal DPI for dots.ocr
-                    # Dots.ocr works best with DPI 200-300
-                    mat = fitz.Matrix(dpi/72, dpi/72)  # Convert DPI to zoom factor
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Save temporary image with better naming
-                    temp_image_path = f"/tmp/dots_ocr_pdf_{page_num}_{hash(str(pdf_path))}.png"
-                    pix.save(temp_image_path)
-                    
-                    logger.debug(f"Processing page {page_num + 1}/{total_pages}")
-                    
-                    # Process the page image with dots.ocr
-                    page_result = await self.extract_text_from_image(temp_image_path, task_type)
-                    page_result["page_num"] = page_num + 1
-                    page_result["page_total"] = total_pages
-                    all_results.append(page_result)
-                    
-                    # Clean up temporary file immediately
+            # Pipeline rasterization and OCR: one thread renders pages (PyMuPDF documents
+            # aren't thread-safe) while earlier pages are being OCR'd, with at most
+            # num_threads * 2 pages in flight to bound memory
+            loop = asyncio.get_running_loop()
+            render_pool = ThreadPoolExecutor(max_workers=1)
+            in_flight = asyncio.Semaphore(num_threads * 2)
+            
+            async def process_page(page_num: int) -> Dict[str, Any]:
+                async with in_flight:
                     try:
-                        os.remove(temp_image_path)
+                        image = await loop.run_in_executor(render_pool, _render_pdf_page, doc, page_num, dpi)
+                        
+                        logger.debug(f"Processing page {page_num + 1}/{total_pages}")
+                        
+                        # Process the page image with dots.ocr
+                        page_result = await self.extract_text_from_image(image, task_type)
+                        page_result["page_num"] = page_num + 1
+                        page_result["page_total"] = total_pages
+                        return page_result
+                        
                     except Exception as e:
-                        logger.warning(f"Failed to remove temp file {temp_image_path}: {e}")
-                    
-                    # Memory cleanup after each page
-                    del pix
-                    del page
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process page {page_num + 1}: {e}")
-                    # Add error result for this page
-                    all_results.append({
-                        "page_num": page_num + 1,
-                        "page_total": total_pages,
-                        "success": False,
-                        "error": str(e),
-                        "text": "",
-                        "parsed": None
-                    })
+                        logger.error(f"Failed to process page {page_num + 1}: {e}")
+                        # Add error result for this page
+                        return {
+                            "page_num": page_num + 1,
+                            "page_total": total_pages,
+                            "success": False,
+                            "error": str(e),
+                            "text": "",
+                            "parsed": None
+                        }
             
-            doc.close()
+            try:
+                all_results = await asyncio.gather(*(process_page(page_num) for page_num in range(total_pages)))
+            finally:
+                # A render may still be running on cancellation or error; let it finish
+                # before closing the document it reads from
+                await asyncio.to_thread(render_pool.shutdown, wait=True, cancel_futures=True)
+                doc.close()
             
             # Combine results from all pages with better formatting
-            combined_text = ""
+            text_parts = []
             successful_pages = 0
             
-            for i, result in enumerate(all_results):
+            for result in all_results:
                 if result.get("success", False):
                     successful_pages += 1
                     page_text = result.get("text", "")
                     if page_text.strip():
-                        combined_text += f"\n\n--- עמוד {result['page_num']} ---\n\n{page_text}"
+                        text_parts.append(f"\n\n--- עמוד {result['page_num']} ---\n\n{page_text}")
                 else:
-                    combined_text += f"\n\n--- עמוד {result['page_num']} (שגיאה) ---\n\n"
+                    text_parts.append(f"\n\n--- עמוד {result['page_num']} (שגיאה) ---\n\n")
+            combined_text = "".join(text_parts)
             
             logger.info(f"PDF processing completed: {successful_pages}/{total_pages} pages successful")
             
@@ -342,7 +621,7 @@ class DotsOCRService:
                 self.processor = None
             
             # Clear GPU cache if available
-            if torch.cuda.is_available():
+            if _CUDA_AVAILABLE:
                 torch.cuda.empty_cache()
                 logger.info("GPU memory cache cleared")
             
@@ -360,7 +639,7 @@ class DotsOCRService:
                 "device": self.device
             }
             
-            if torch.cuda.is_available():
+            if _CUDA_AVAILABLE:
                 memory_info.update({
                     "gpu_memory_allocated": f"{torch.cuda.memory_allocated() / 1024**3:.2f} GB",
                     "gpu_memory_reserved": f"{torch.cuda.memory_reserved() / 1024**3:.2f} GB",
@@ -393,24 +672,30 @@ class TesseractOCRService:
         """Check if Tesseract is available"""
         return TESSERACT_AVAILABLE
     
-    async def extract_text_from_image(self, image_path: Union[str, Path]) -> str:
+    async def extract_text_from_image(self, image_path: ImageInput) -> str:
         """Extract text from image using Tesseract OCR"""
         if not self.is_available():
             raise RuntimeError("Tesseract OCR is not available")
         
         try:
-            image = Image.open(image_path)
-            # Configure Tesseract for Hebrew + English
-            custom_config = r'--oem 3 --psm 6'
-            text = pytesseract.image_to_string(
-                image, 
-                lang=self.lang,
-                config=custom_config
-            )
-            return text.strip()
+            # Decoding and the tesseract subprocess block, so run them off the event loop
+            return await asyncio.to_thread(self._extract_text_sync, image_path)
         except Exception as e:
             logger.error(f"Tesseract OCR failed for {image_path}: {e}")
             raise
+    
+    def _extract_text_sync(self, image_path: ImageInput) -> str:
+        image = _image_source(image_path)
+        if isinstance(image, str):
+            image = Image.open(image)
+        # Configure Tesseract for Hebrew + English
+        custom_config = r'--oem 3 --psm 6'
+        text = pytesseract.image_to_string(
+            image, 
+            lang=self.lang,
+            config=custom_config
+        )
+        return text.strip()
 
 class OCRService:
     """Main OCR service that coordinates different OCR methods"""
@@ -419,10 +704,14 @@ class OCRService:
         self.dots_ocr = DotsOCRService()
         self.tesseract_ocr = TesseractOCRService()
         self.initialized = False
+        # Concurrent first requests must not load the model twice
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
         """Initialize OCR services"""
-        if not self.initialized:
+        async with self._init_lock:
+            if self.initialized:
+                return
             try:
                 await self.dots_ocr.initialize()
                 logger.info("OCR Service initialized successfully")
@@ -433,7 +722,7 @@ class OCRService:
     
     async def extract_text_from_image(
         self, 
-        image_path: Union[str, Path],
+        image_path: ImageInput,
         use_fallback: bool = True,
         task_type: str = "full"
     ) -> Dict[str, Any]:
@@ -492,9 +781,21 @@ class OCRService:
                 result["error"] = f"Both OCR methods failed. Dots: {result['error']}, Tesseract: {str(e)}"
         
         return result
-    
+
+    async def extract_text_from_images_batch(
+        self,
+        image_paths: List[ImageInput],
+        use_fallback: bool = True,
+        task_type: str = "full"
+    ) -> List[Dict[str, Any]]:
+        """Extract text from several images; dots.ocr runs them through batched generate() calls"""
+        return list(await asyncio.gather(*(
+            self.extract_text_from_image(image_path, use_fallback, task_type)
+            for image_path in image_paths
+        )))
+
     async def extract_text_from_pdf(
-        self, 
+        self,
         pdf_path: Union[str, Path],
         use_fallback: bool = True,
         task_type: str = "full"
@@ -1,27 +1,39 @@
 import asyncio
-import json
 import logging
 import os
+import sqlite3
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Set, Optional
-import hashlib
+from typing import Dict, FrozenSet, List, Set, Optional, Iterable, Tuple
 
 from config import settings
 from services.rag_agent import rag_service
 
 logger = logging.getLogger(__name__)
 
+# A processed file is identified by (path, mtime_ns, size): any change to the file
+# produces a new key, without hashing anything
+FileKey = Tuple[str, int, int]
+
 class PeriodicIndexer:
     """Service for periodically indexing files from a watched directory"""
     
     def __init__(self):
         self.watch_directory = Path(settings.watch_directory)
         self.processed_files_db = Path(settings.processed_files_db)
+        # Older releases tracked processed files in a JSON document
+        if self.processed_files_db.suffix == ".json":
+            self.processed_files_db = self.processed_files_db.with_suffix(".sqlite")
+        self._db: Optional[sqlite3.Connection] = None
+        # Database calls run in worker threads; serialize them on the connection
+        self._db_lock = threading.Lock()
         self.scan_interval = settings.scan_interval_seconds
         self.enabled = settings.enable_periodic_indexing
-        self.processed_files: Set[str] = set()
+        # Settings store extensions lowercased; keep a local reference for the walk
+        self._ext_set = frozenset(settings.supported_extensions)
+        self.processed_files: Set[FileKey] = set()
         self.running = False
         self.task: Optional[asyncio.Task] = None
         
@@ -78,6 +90,11 @@ class PeriodicIndexer:
                     await self.task
                 except asyncio.CancelledError:
                     pass
+            
+            with self._db_lock:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
             logger.info("Periodic indexer stopped")
             
         except Exception as e:
@@ -100,19 +117,15 @@ class PeriodicIndexer:
     async def _scan_and_index(self):
         """Scan directory for new files and index them"""
         try:
-            # Get all files in watch directory
-            new_files = []
-            
-            for file_path in self.watch_directory.rglob("*"):
-                if file_path.is_file():
-                    # Check if file is supported
-                    if file_path.suffix.lower() in settings.supported_extensions:
-                        # Generate file hash for tracking
-                        file_hash = await self._get_file_hash(file_path)
-                        
-                        # Check if file was already processed
-                        if file_hash not in self.processed_files:
-                            new_files.append((file_path, file_hash))
+            # Get all supported files in watch directory (walking is blocking I/O)
+            file_keys = await asyncio.to_thread(self._list_files, str(self.watch_directory), self._ext_set)
+            
+            # Check which files were not processed yet
+            new_files = [
+                (Path(file_key[0]), file_key)
+                for file_key in file_keys
+                if file_key not in self.processed_files
+            ]
             
             if new_files:
                 logger.info(f"Found {len(new_files)} new files to index")
@@ -127,18 +140,17 @@ class PeriodicIndexer:
         """Process new files and add them to the knowledge base"""
         try:
             file_paths = [file_path for file_path, _ in new_files]
-            file_hashes = [file_hash for _, file_hash in new_files]
+            file_keys = [file_key for _, file_key in new_files]
             
             # Process files using RAG service
             result = await rag_service.add_documents_from_files([str(fp) for fp in file_paths])
             
             if result["success"]:
                 # Mark files as processed
-                for file_hash in file_hashes:
-                    self.processed_files.add(file_hash)
+                self.processed_files.update(file_keys)
                 
                 # Save processed files database
-                await self._save_processed_files()
+                await self._save_processed_files(file_keys)
                 
                 logger.info(f"Successfully indexed {result['files_processed']} files")
                 logger.info(f"Added {result['documents_added']} document chunks")
@@ -155,63 +167,109 @@ class PeriodicIndexer:
     async def _cleanup_processed_files(self, file_paths):
         """Clean up processed files (move to archive or delete)"""
         try:
-            for file_path in file_paths:
-                try:
-                    # For now, just delete the file
-                    # You could modify this to move files to an archive directory
-                    file_path.unlink()
-                    logger.debug(f"Deleted processed file: {file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete file {file_path}: {e}")
+            # Unlink the whole batch in one worker thread, off the event loop
+            await asyncio.to_thread(self._delete_files, file_paths)
                     
         except Exception as e:
             logger.error(f"Error during file cleanup: {e}")
     
-    async def _get_file_hash(self, file_path: Path) -> str:
-        """Generate hash for file to track if it was processed"""
-        try:
-            # Use file modification time and size for quick hash
-            stat = file_path.stat()
-            hash_input = f"{file_path.name}_{stat.st_mtime}_{stat.st_size}"
-            return hashlib.md5(hash_input.encode()).hexdigest()
-        except Exception as e:
-            logger.error(f"Error generating file hash for {file_path}: {e}")
-            # Fallback to filename
-            return hashlib.md5(file_path.name.encode()).hexdigest()
+    @staticmethod
+    def _delete_files(file_paths: Iterable[Path]):
+        """Delete processed files (blocking)"""
+        for file_path in file_paths:
+            try:
+                # For now, just delete the file
+                # You could modify this to move files to an archive directory
+                os.unlink(file_path)
+                logger.debug(f"Deleted processed file: {file_path}")
+            except OSError as e:
+                logger.warning(f"Failed to delete file {file_path}: {e}")
+    
+    @staticmethod
+    def _list_files(root: str, extensions: FrozenSet[str]) -> List[FileKey]:
+        """Walk the tree with os.scandir, returning keys for supported files
+        
+        Directory entries carry the file type, so only supported files are stat'ed,
+        once each, for the key identifying this version of the file.
+        """
+        file_keys = []
+        pending = [root]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif (entry.is_file()
+                                  and os.path.splitext(entry.name)[1].lower() in extensions):
+                                stat = entry.stat()
+                                file_keys.append((entry.path, stat.st_mtime_ns, stat.st_size))
+                        except OSError as e:
+                            # Most likely removed while walking
+                            logger.warning(f"Could not stat {entry.path}: {e}")
+            except OSError as e:
+                logger.warning(f"Could not list directory: {e}")
+        return file_keys
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the processed files database (SQLite in WAL mode)"""
+        if self._db is None:
+            self.processed_files_db.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.processed_files_db, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # The old table held MD5 digests that can't be mapped to file keys
+            db.execute("DROP TABLE IF EXISTS processed")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS processed_files ("
+                "path TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, processed_at TEXT NOT NULL, "
+                "PRIMARY KEY (path, mtime_ns, size)) WITHOUT ROWID"
+            )
+            self._db = db
+        return self._db
     
     async def _load_processed_files(self):
         """Load processed files database"""
         try:
-            if self.processed_files_db.exists():
-                with open(self.processed_files_db, 'r') as f:
-                    data = json.load(f)
-                    self.processed_files = set(data.get("processed_files", []))
+            self.processed_files = await asyncio.to_thread(self._read_processed_files)
+            if self.processed_files:
                 logger.info(f"Loaded {len(self.processed_files)} processed files from database")
             else:
-                self.processed_files = set()
-                logger.info("No processed files database found, starting fresh")
+                logger.info("No processed files recorded, starting fresh")
                 
         except Exception as e:
             logger.error(f"Error loading processed files database: {e}")
             self.processed_files = set()
     
-    async def _save_processed_files(self):
-        """Save processed files database"""
+    async def _save_processed_files(self, file_keys: Iterable[FileKey]):
+        """Record newly processed files in the database"""
         try:
-            data = {
-                "processed_files": list(self.processed_files),
-                "last_updated": datetime.utcnow().isoformat(),
-                "total_processed": len(self.processed_files)
-            }
-            
-            with open(self.processed_files_db, 'w') as f:
-                json.dump(data, f, indent=2)
+            await asyncio.to_thread(self._write_processed_files, list(file_keys))
                 
             logger.debug(f"Saved {len(self.processed_files)} processed files to database")
             
         except Exception as e:
             logger.error(f"Error saving processed files database: {e}")
     
+    def _read_processed_files(self) -> Set[FileKey]:
+        """Read all processed file keys (blocking)"""
+        with self._db_lock:
+            return set(self._connect().execute("SELECT path, mtime_ns, size FROM processed_files"))
+    
+    def _write_processed_files(self, file_keys: List[FileKey]):
+        """Upsert processed file keys in one transaction (blocking)"""
+        processed_at = datetime.utcnow().isoformat()
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute("BEGIN")
+                db.executemany(
+                    "INSERT INTO processed_files (path, mtime_ns, size, processed_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(path, mtime_ns, size) DO UPDATE SET processed_at = excluded.processed_at",
+                    ((*file_key, processed_at) for file_key in file_keys)
+                )
+    
     async def get_status(self) -> Dict:
         """Get status of the periodic indexer"""
         return {
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, BinaryIO, Union
 import asyncio
 
 from agno.agent import Agent
@@ -11,6 +11,7 @@ from config import settings
 from services.vector_store_service import vector_service
 from services.llm_service import hebrew_llm_service
 from services.document_processor import document_processor
+from services.semantic_cache import semantic_cache
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +90,9 @@ class HebrewRAGAgent:
             # Add documents to vector store
             document_ids = await vector_service.add_documents(documents)
             
+            # Cached answers may be stale now that the knowledge base changed
+            semantic_cache.clear()
+            
             # Get updated stats
             stats = await vector_service.get_collection_stats()
             
@@ -110,8 +114,8 @@ class HebrewRAGAgent:
                 "error": str(e)
             }
     
-    async def process_and_add_files(self, file_paths: List[str]) -> Dict[str, Any]:
-        """Process files and add them to knowledge base"""
+    async def process_and_add_files(self, file_paths: List[Union[str, Tuple[str, BinaryIO]]]) -> Dict[str, Any]:
+        """Process files (paths or (filename, stream) pairs) and add them to knowledge base"""
         if not self.initialized:
             await self.initialize()
         
@@ -243,6 +247,7 @@ class HebrewRAGAgent:
         
         try:
             await vector_service.delete_collection()
+            semantic_cache.clear()
             # Reinitialize to recreate the collection
             await vector_service.initialize()
             
@@ -274,6 +279,10 @@ class RAGService:
         """Add documents from file paths"""
         return await self.rag_agent.process_and_add_files(file_paths)
     
+    async def add_documents_from_streams(self, streams: List[Tuple[str, BinaryIO]]) -> Dict[str, Any]:
+        """Add documents from (filename, stream) pairs without a disk round-trip"""
+        return await self.rag_agent.process_and_add_files(streams)
+    
     async def query_documents(self, question: str, stream: bool = False) -> Dict[str, Any]:
         """Query the document collection"""
         return await self.rag_agent.query(question, stream)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from config import settings
+from services.vector_store_service import vector_service, MockEmbeddings
+
+logger = logging.getLogger(__name__)
+
+class SemanticQueryCache:
+    """Two-tier cache for RAG answers: exact question match, then embedding similarity"""
+
+    def __init__(self):
+        self.enabled = settings.query_cache_enabled
+        self.max_size = settings.query_cache_size
+        self.ttl = settings.query_cache_ttl_seconds
+        self.similarity_threshold = settings.semantic_cache_threshold
+        self.min_semantic_length = settings.semantic_cache_min_length
+
+        # normalized question -> (expires_at, response)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Embeddings computed on a miss, kept until the answer is stored
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        # Unit-normalized question embeddings for similarity lookups, one slot per cached
+        # question (free slots are all zeros), plus a reusable output buffer for the scores
+        self._vectors: Optional[np.ndarray] = None
+        self._scores: Optional[np.ndarray] = None
+        self._vector_keys: List[Optional[str]] = [None] * self.max_size
+        self._slots: Dict[str, int] = {}  # normalized question -> slot
+        self._free_slots = list(range(self.max_size - 1, -1, -1))
+
+        # Bumped by clear(), so answers computed against an older knowledge base aren't stored
+        self.generation = 0
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return " ".join(question.split()).lower()
+
+    def _embeddings(self):
+        """Return the embedding model if it is usable for similarity lookups"""
+        embeddings = vector_service.embedding_service.langchain_embeddings
+        # Mock embeddings return the same vector for every text, so every lookup would hit
+        if embeddings is None or isinstance(embeddings, MockEmbeddings):
+            return None
+        return embeddings
+
+    async def _embed(self, question: str) -> Optional[np.ndarray]:
+        embeddings = self._embeddings()
+        if embeddings is None:
+            return None
+
+        vector = np.asarray(await asyncio.to_thread(embeddings.embed_query, question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        vector /= norm
+        return vector
+
+    def _get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._free_slot(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    def _free_slot(self, key: str):
+        """Drop the question's embedding so it can't win similarity lookups"""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._vectors[slot] = 0
+        self._vector_keys[slot] = None
+        self._free_slots.append(slot)
+
+    async def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return a cached answer for the question, or None on a miss
+        
+        Read generation before calling this and pass it to put(), so an answer
+        isn't stored if the cache was cleared while it was being computed.
+        """
+        if not self.enabled:
+            return None
+
+        key = self._normalize(question)
+        response = self._get_exact(key)
+        if response is not None:
+            logger.debug("Query cache hit (exact)")
+            return response
+
+        if len(key) < self.min_semantic_length:
+            return None
+
+        try:
+            query_vector = await self._embed(key)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+        if query_vector is None:
+            return None
+
+        self._pending[key] = query_vector
+        while len(self._pending) > self.max_size:
+            self._pending.popitem(last=False)
+
+        if self._vectors is None:
+            return None
+
+        # Cosine similarity against all cached questions in a single matmul
+        scores = np.matmul(self._vectors, query_vector, out=self._scores)
+        while True:
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold or self._vector_keys[best] is None:
+                return None
+
+            response = self._get_exact(self._vector_keys[best])
+            if response is not None:
+                logger.debug(f"Query cache hit (semantic, score={scores[best]:.3f})")
+                return response
+            # The match expired (and lost its slot); fall back to the next best one
+            scores[best] = -1.0
+
+    async def put(self, question: str, response: Dict[str, Any], generation: int):
+        """Store an answer for the question, unless the cache was cleared since generation"""
+        if not self.enabled or generation != self.generation:
+            return
+
+        key = self._normalize(question)
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._free_slot(evicted)
+
+        query_vector = self._pending.pop(key, None)
+        if query_vector is None:
+            return
+
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_size, query_vector.shape[0]), dtype=np.float32)
+            self._scores = np.empty(self.max_size, dtype=np.float32)
+
+        # Re-putting a question replaces its embedding in place; every slot belongs to a
+        # cached question, so there is always a free one for a new question
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._free_slots.pop()
+            self._slots[key] = slot
+            self._vector_keys[slot] = key
+        self._vectors[slot] = query_vector
+
+    def clear(self):
+        """Drop all cached answers (call whenever the knowledge base changes)"""
+        self.generation += 1
+        self._entries.clear()
+        self._pending.clear()
+        self._vectors = None
+        self._scores = None
+        self._vector_keys = [None] * self.max_size
+        self._slots.clear()
+        self._free_slots = list(range(self.max_size - 1, -1, -1))
+
+# Global semantic cache instance
+semantic_cache = SemanticQueryCache()
@@ -1,5 +1,9 @@
+import asyncio
+import importlib.util
 import logging
+import multiprocessing
 import torch
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
 import tempfile
@@ -8,8 +12,29 @@ from transformers import WhisperProcessor, WhisperForConditionalGeneration
 import librosa
 import numpy as np
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
+try:
+    import torchaudio
+    TORCHAUDIO_AVAILABLE = True
+except ImportError:
+    TORCHAUDIO_AVAILABLE = False
+
+# Per-process service used by transcription pool workers
+_worker_service: Optional["HebrewTranscriptionService"] = None
+
+def _init_worker(workers: int):
+    """Pool initializer: load Whisper once per worker process, splitting CPU threads between workers"""
+    global _worker_service
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _worker_service = HebrewTranscriptionService()
+    _worker_service._load_model()
+
+def _transcribe_in_worker(audio_path: str, language: str, task: str) -> str:
+    return _worker_service._transcribe(audio_path, language, task)
+
 class HebrewTranscriptionService:
     """Hebrew Speech-to-Text service using ivrit-ai/whisper-large-v3"""
     
@@ -19,6 +44,11 @@ class HebrewTranscriptionService:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_name = "ivrit-ai/whisper-large-v3"
         self.initialized = False
+        # On CPU, transcriptions can run in parallel worker processes, each with its own model
+        self.workers = settings.audio_workers if self.device == "cpu" else 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # The in-process model handles one transcription at a time
+        self._model_lock = asyncio.Lock()
         
     async def initialize(self):
         """Initialize the Whisper model and processor"""
@@ -26,16 +56,19 @@ class HebrewTranscriptionService:
             logger.info(f"Initializing Hebrew Whisper model: {self.model_name}")
             logger.info(f"Using device: {self.device}")
             
-            # Load processor and model
-            self.processor = WhisperProcessor.from_pretrained(self.model_name)
-            self.model = WhisperForConditionalGeneration.from_pretrained(
-                self.model_name,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None
-            )
-            
-            if self.device == "cpu":
-                self.model = self.model.to(self.device)
+            if self.workers > 0:
+                # Workers load their own model on start-up; spawn avoids forking a process
+                # with torch's thread pools already running
+                logger.info(f"Using {self.workers} transcription worker processes")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.workers,)
+                )
+            else:
+                # Load processor and model off the event loop so other services can start meanwhile
+                await asyncio.to_thread(self._load_model)
             
             self.initialized = True
             logger.info("Hebrew Whisper model initialized successfully")
@@ -44,8 +77,57 @@ class HebrewTranscriptionService:
             logger.error(f"Failed to initialize Hebrew Whisper model: {e}")
             raise
     
+    def _load_model(self):
+        """Load the Whisper processor and model (blocking)"""
+        self.processor = WhisperProcessor.from_pretrained(self.model_name)
+        # Fused attention kernels: FlashAttention 2 on GPU when installed, PyTorch SDPA otherwise
+        attn_implementation = (
+            "flash_attention_2"
+            if self.device == "cuda" and importlib.util.find_spec("flash_attn") is not None
+            else "sdpa"
+        )
+        if self.device == "cuda":
+            torch_dtype = torch.float16
+        else:
+            # Decoding on CPU is bound by weight fetches; bf16 halves them (fast on AVX512-BF16/AMX)
+            torch_dtype = torch.bfloat16 if settings.whisper_quant == "bf16" else torch.float32
+        self.model = WhisperForConditionalGeneration.from_pretrained(
+            self.model_name,
+            torch_dtype=torch_dtype,
+            device_map="auto" if self.device == "cuda" else None,
+            attn_implementation=attn_implementation
+        )
+        logger.info(f"Whisper attention implementation: {attn_implementation}")
+        
+        if self.device == "cpu":
+            self.model = self.model.to(self.device)
+            if settings.whisper_quant == "int8":
+                # Dynamic int8 quantization of the Linear layers: int8 weights, activations quantized per call
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            logger.info(f"Whisper CPU precision: {settings.whisper_quant}")
+    
     def _load_audio(self, audio_path: str, target_sr: int = 16000) -> np.ndarray:
         """Load and preprocess audio file"""
+        if TORCHAUDIO_AVAILABLE:
+            try:
+                # Native decode and resampling, instead of audioread + scipy
+                waveform, sr = torchaudio.load(audio_path)
+                
+                # Ensure audio is mono
+                if waveform.shape[0] > 1:
+                    waveform = waveform.mean(dim=0, keepdim=True)
+                
+                if sr != target_sr:
+                    waveform = torchaudio.functional.resample(waveform, sr, target_sr)
+                
+                return waveform.squeeze(0).numpy()
+                
+            except Exception as e:
+                # No torchaudio backend for this format; librosa goes through ffmpeg
+                logger.debug(f"torchaudio could not load {audio_path}, using librosa: {e}")
+        
         try:
             # Load audio with librosa
             audio, sr = librosa.load(audio_path, sr=target_sr)
@@ -60,6 +142,36 @@ class HebrewTranscriptionService:
             logger.error(f"Failed to load audio file {audio_path}: {e}")
             raise
     
+    def _transcribe(self, audio_path: str, language: str, task: str) -> str:
+        """Run Whisper on an audio file (blocking)"""
+        # Load and preprocess audio
+        audio = self._load_audio(audio_path)
+        
+        # Process audio with Whisper
+        inputs = self.processor(
+            audio, 
+            sampling_rate=16000, 
+            return_tensors="pt"
+        ).input_features
+        
+        # Move to device, in the model's floating point precision
+        inputs = inputs.to(self.device, dtype=self.model.dtype)
+        
+        # Generate transcription
+        with torch.no_grad():
+            predicted_ids = self.model.generate(
+                inputs,
+                language=language,
+                task=task,
+                do_sample=False
+            )
+        
+        # Decode transcription
+        return self.processor.batch_decode(
+            predicted_ids, 
+            skip_special_tokens=True
+        )[0]
+        
     async def transcribe_audio(
         self, 
         audio_path: str,
@@ -73,33 +185,15 @@ class HebrewTranscriptionService:
         try:
             logger.info(f"Transcribing audio: {audio_path}")
             
-            # Load and preprocess audio
-            audio = self._load_audio(audio_path)
-            
-            # Process audio with Whisper
-            inputs = self.processor(
-                audio, 
-                sampling_rate=16000, 
-                return_tensors="pt"
-            ).input_features
-            
-            # Move to device
-            inputs = inputs.to(self.device)
-            
-            # Generate transcription
-            with torch.no_grad():
-                predicted_ids = self.model.generate(
-                    inputs,
-                    language=language,
-                    task=task,
-                    do_sample=False
+            # Decoding takes seconds, so it runs in a worker process or thread
+            if self._pool is not None:
+                loop = asyncio.get_running_loop()
+                transcription = await loop.run_in_executor(
+                    self._pool, _transcribe_in_worker, audio_path, language, task
                 )
-            
-            # Decode transcription
-            transcription = self.processor.batch_decode(
-                predicted_ids, 
-                skip_special_tokens=True
-            )[0]
+            else:
+                async with self._model_lock:
+                    transcription = await asyncio.to_thread(self._transcribe, audio_path, language, task)
             
             logger.info(f"Transcription completed: {len(transcription)} characters")
             
@@ -151,6 +245,9 @@ class HebrewTranscriptionService:
     
     async def close(self):
         """Clean up resources"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
         if self.model:
             del self.model
         if self.processor:
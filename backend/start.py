@@ -16,7 +16,7 @@ from main import app
 from config import settings
 from services.rag_agent import rag_service
 
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by main on import
 logger = logging.getLogger(__name__)
 
 
@@ -95,6 +95,7 @@ async def main():
             host=settings.api_host,
             port=settings.api_port,
             log_level="info",
+            http="httptools",
             reload=False  # Set to True for development
         )
 
@@ -109,4 +110,11 @@ async def main():
 
 
 if __name__ == "__main__":
+    # The server runs inside our own event loop, so uvicorn's loop setting
+    # doesn't apply here; install uvloop before creating it
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())